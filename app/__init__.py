@@ -1,23 +1,46 @@
 from flask import Flask, render_template
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from app.extensions import db, migrate, socketio, swagger
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app.extensions import db, migrate, socketio, swagger, cache, emitter, metrics
+from app.modules.realtime import message_queue_options
+from app.modules.json_provider import init_json_provider
 from config import Config
 from app import models
 from app.routes import api
 from app.controllers.main_controller import main_bp
+from app.commands import register_commands
+from app.modules.counters import choosen_counter
+from app.modules.search import search
+from app.modules.idempotency import idempotency
+from app.modules.rate_limit import limiter
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    init_json_provider(app)
+    app.logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+
+    # Behind nginx every request comes from the proxy; trust its
+    # X-Forwarded-For/-Proto so remote_addr (rate limits) is the client's.
+    if app.config.get('PROXY_FIX_HOPS'):
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
     
     CORS(app, supports_credentials=True, resources={r"/*": {"origins": Config.CORS_ALLOWED_ORIGINS, "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": "*"}})
     JWTManager(app)
 
     db.init_app(app)
     migrate.init_app(app, db)
-    socketio.init_app(app)
+    socketio.init_app(app, **message_queue_options(app.config))
+    emitter.init_app(app)
     swagger.init_app(app)
+    cache.init_app(app)
+    metrics.init_app(app)
+    choosen_counter.init_app(app)
+    search.init_app(app)
+    idempotency.init_app(app)
+    limiter.init_app(app)
     
     @app.route('/')
     def index():
@@ -25,6 +48,7 @@ def create_app():
 
     app.register_blueprint(api)
     app.register_blueprint(main_bp)
+    register_commands(app)
     
     with app.app_context():
         from app import events
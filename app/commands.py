@@ -0,0 +1,155 @@
+import click
+from flask.cli import with_appcontext
+from app import db
+from app.models.product import Product
+from app.models.haircut import Haircut
+from app.models.haircut_transactions import HaircutTransaction
+from app.models.product_transactions import ProductTransaction
+from app.controllers import cart_controller as carts
+from app.controllers import haircut_controller as haircuts
+from app.controllers import haircut_transaction_controller as haircut_transactions
+from app.controllers import product_controller as products
+from app.controllers import product_transaction_controller as product_transactions
+from app.modules import reporting
+from app.modules.counters import choosen_counter
+from app.modules.idempotency import idempotency
+from app.modules.image_variants import generate_variants, IMAGE_READY
+from app.modules.pagination import ordered
+
+SAMPLE_ID = '00000000-0000-0000-0000-000000000000'
+PAGE_LIMIT = 10
+
+
+def _listed(query, sorting, id_column):
+    """``query`` ordered by ``sorting``'s default and cut to one keyset page,
+    as ``paginate`` runs it."""
+    sort_column, descending = sorting.parse(None)
+    return ordered(query, (sort_column, id_column), descending).limit(PAGE_LIMIT + 1)
+
+
+def _hot_queries():
+    return {
+        "product_transactions by user": _listed(
+            product_transactions.transactions_query(product_transactions.TRANSACTION_VIEW, SAMPLE_ID),
+            product_transactions.TRANSACTION_SORT, ProductTransaction.id),
+        "product_transactions list": _listed(
+            product_transactions.transactions_query(product_transactions.TRANSACTION_ADMIN_VIEW),
+            product_transactions.TRANSACTION_SORT, ProductTransaction.id),
+        "haircut_transactions by user": _listed(
+            haircut_transactions.transactions_query(haircut_transactions.TRANSACTION_VIEW, SAMPLE_ID),
+            haircut_transactions.TRANSACTION_SORT, HaircutTransaction.id),
+        "haircut_transactions list": _listed(
+            haircut_transactions.transactions_query(haircut_transactions.TRANSACTION_ADMIN_VIEW),
+            haircut_transactions.TRANSACTION_SORT, HaircutTransaction.id),
+        "cart_items by user": carts.cart_query(SAMPLE_ID),
+        "cart_items by user and product": carts.cart_item_query(SAMPLE_ID, SAMPLE_ID),
+        "haircuts catalog": _listed(
+            haircuts.catalog_query(haircuts.HAIRCUT_VIEW),
+            haircuts.HAIRCUT_SORT, Haircut.id),
+        "products catalog": _listed(
+            products.catalog_query(products.PRODUCT_VIEW),
+            products.PRODUCT_SORT, Product.id),
+    }
+
+
+def _uses_index(sql):
+    """``(ok, plan)``. On SQLite every table must be searched through an
+    index; a ``SCAN`` is allowed only along an index on a query with a LIMIT,
+    where it stops after one page. Sorting the whole result in a temp B-tree
+    fails; sorting its right part only orders ties of the indexed sort column
+    by id (InnoDB indexes end with the primary key, so MySQL needs no sort)."""
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        details = [row[-1] for row in rows]
+        limited = ' LIMIT ' in sql.upper()
+        ok = bool(details) and not any(
+            detail == 'USE TEMP B-TREE FOR ORDER BY'
+            or (detail.startswith('SCAN') and not (limited and 'USING' in detail and 'INDEX' in detail))
+            for detail in details
+        )
+        return ok, details
+
+    rows = db.session.execute(db.text(f"EXPLAIN {sql}")).mappings().all()
+    keys = [row.get('key') for row in rows]
+    return all(keys), keys
+
+
+@click.command('explain-check')
+@with_appcontext
+def explain_check():
+    """Assert every hot controller query is served by an index."""
+    failed = []
+
+    for name, query in _hot_queries().items():
+        sql = str(query.statement.compile(
+            dialect=db.engine.dialect,
+            compile_kwargs={"literal_binds": True}
+        ))
+        ok, plan = _uses_index(sql)
+        click.echo(f"[{'OK' if ok else 'FAIL'}] {name}: {plan}")
+        if not ok:
+            failed.append(name)
+
+    if failed:
+        raise click.ClickException(f"No index used for: {', '.join(failed)}")
+
+
+@click.command('generate-image-variants')
+@with_appcontext
+def generate_image_variants():
+    """Backfill thumb/card/full variants for existing catalog images and mark
+    their rows ready (this also repairs rows whose image_status is failed)."""
+    keys = [row.image_key for row in db.session.query(Product.image_key).filter(Product.image_key.isnot(None))]
+    keys += [row.image_key for row in db.session.query(Haircut.image_key).filter(Haircut.image_key != '')]
+
+    ready = []
+    for key in keys:
+        try:
+            generate_variants(key)
+            ready.append(key)
+            click.echo(f"[OK] {key}")
+        except Exception as e:
+            click.echo(f"[FAIL] {key}: {e}")
+
+    for model in (Product, Haircut):
+        model.query.filter(model.image_key.in_(ready)).update({'image_status': IMAGE_READY}, synchronize_session=False)
+    db.session.commit()
+
+
+@click.command('backfill-reports')
+@with_appcontext
+def backfill_reports():
+    """Rebuild the hourly/daily report rollups from the transaction tables."""
+    rows = reporting.rebuild(
+        ProductTransaction.query.yield_per(500),
+        HaircutTransaction.query.yield_per(500)
+    )
+    db.session.commit()
+    click.echo(f"Rebuilt {rows} rollup rows")
+
+
+@click.command('reconcile-choosen-count')
+@with_appcontext
+def reconcile_choosen_count():
+    """Recompute Haircut.choosen_count from haircut_transactions."""
+    drifted = choosen_counter.reconcile()
+    for haircut_id, count in drifted.items():
+        click.echo(f"[FIXED] {haircut_id}: {count}")
+    click.echo(f"{len(drifted)} haircut(s) corrected")
+
+
+@click.command('purge-idempotency-keys')
+@with_appcontext
+def purge_idempotency_keys():
+    """Delete expired Idempotency-Key records."""
+    click.echo(f"{idempotency.purge_expired()} expired key(s) deleted")
+
+
+def register_commands(app):
+    app.cli.add_command(explain_check)
+    app.cli.add_command(generate_image_variants)
+    app.cli.add_command(backfill_reports)
+    app.cli.add_command(reconcile_choosen_count)
+    app.cli.add_command(purge_idempotency_keys)
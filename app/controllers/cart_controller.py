@@ -6,11 +6,23 @@ from app import db
 from app.modules import response
 from app.modules.swagger_utils import get_doc_path
 from app.models.product_transactions import CartItem
-from app.models.product import Product
+from app.modules.stock import ensure_available, StockReservationError
 
 cart_bp = Blueprint('cart', __name__, url_prefix='/carts')
 
 
+def cart_query(user_id):
+    """The user's cart with products loaded; ``flask explain-check`` plans
+    the same query."""
+    return CartItem.query \
+        .options(joinedload(CartItem.product)) \
+        .filter_by(user_id=user_id)
+
+
+def cart_item_query(user_id, product_id):
+    return CartItem.query.filter_by(user_id=user_id, product_id=product_id)
+
+
 @cart_bp.route('/', methods=['GET'], strict_slashes=False)
 @jwt_required()
 @swag_from(get_doc_path('cart/get.yml'))
@@ -18,10 +30,7 @@ def get_my_cart():
     try:
         user_id = get_jwt_identity()
 
-        cart_items = CartItem.query \
-            .options(joinedload(CartItem.product)) \
-            .filter_by(user_id=user_id) \
-            .all()
+        cart_items = cart_query(user_id).all()
 
         data = []
         grand_total = 0
@@ -74,18 +83,18 @@ def add_to_cart():
         if quantity < 1:
             return response.bad_request("Quantity must be at least 1")
 
-        product = Product.query.get(product_id)
-        if not product:
-            return response.not_found("Product not found")
+        existing_item = cart_item_query(user_id, product_id).first()
+        new_quantity = existing_item.quantity + quantity if existing_item else quantity
 
-        existing_item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
+        try:
+            ensure_available([(product_id, new_quantity)])
+        except StockReservationError as e:
+            available = e.failures[0]['available']
+            if available is None:
+                return response.not_found("Product not found")
+            return response.bad_request(f"Stock insufficient. Max available: {available}")
 
         if existing_item:
-            new_quantity = existing_item.quantity + quantity
-            
-            if new_quantity > product.stock:
-                return response.bad_request(f"Stock insufficient. Max available: {product.stock}")
-            
             existing_item.quantity = new_quantity
             message = "Cart updated successfully"
             
@@ -93,9 +102,6 @@ def add_to_cart():
             return response.ok(existing_item.to_dict(), message)
 
         else:
-            if quantity > product.stock:
-                return response.bad_request(f"Stock insufficient. Max available: {product.stock}")
-
             new_item = CartItem(
                 user_id=user_id,
                 product_id=product_id,
@@ -129,8 +135,10 @@ def update_cart_item(cart_id):
         if new_quantity < 1:
             return response.bad_request("Quantity must be at least 1")
 
-        if new_quantity > cart_item.product.stock:
-            return response.bad_request(f"Stock insufficient. Max available: {cart_item.product.stock}")
+        try:
+            ensure_available([(cart_item.product_id, new_quantity)])
+        except StockReservationError as e:
+            return response.bad_request(f"Stock insufficient. Max available: {e.failures[0]['available'] or 0}")
 
         cart_item.quantity = new_quantity
         db.session.commit()
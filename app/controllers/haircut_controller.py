@@ -1,47 +1,108 @@
+from functools import partial
 from flask import Blueprint, request
-from flask_jwt_extended import (jwt_required , get_jwt_identity)
+from flask_jwt_extended import jwt_required
 from flasgger import swag_from
 from app.models.haircut import Haircut
 from app.modules import response
-from app.modules.transform import transform_data
-from app.modules.upload_r2 import delete_image, upload_image
+from app.modules.projection import Projection, InvalidFields
+from app.modules.image_variants import variant_urls, IMAGE_PENDING, IMAGE_READY, IMAGE_FAILED
+from app.modules.pagination import paginate, Sorting, InvalidCursor, InvalidSort
+from app.modules.upload_r2 import (delete_image, upload_image_async, claim_uploaded_image, generate_variants_async,
+                                  UploadError)
 from app.modules.time import get_wib_time
 from app.modules.swagger_utils import get_doc_path
 from app import db
-from app.models.user import User
+from app.extensions import cache
+from app.modules.auth import require_admin
+from app.modules.pricing import price_table, parse_price
+from app.modules.search import haircut_index, search_page, InvalidSearch
 
 haircut_bp = Blueprint('haircut', __name__, url_prefix='/haircuts')
 
+HAIRCUT_VIEW = Projection(Haircut, computed={'variants': lambda haircut: variant_urls(haircut.image_key, haircut.image_status)},
+                          requires={'variants': ('image_key', 'image_status')})
+
+HAIRCUT_SORT = Sorting(Haircut, ('choosen_count', 'price'), default='-choosen_count')
+
+
+def catalog_query(view):
+    """Unordered query of the live catalog; ``flask explain-check`` plans
+    the same query."""
+    return Haircut.query \
+        .options(*view.options()) \
+        .filter(Haircut.deleted_at.is_(None))
+
+
+def _attach_image(model_id, upload_result):
+    haircut_model = Haircut.query.get(model_id)
+    if not haircut_model:
+        delete_image(upload_result["key"])
+        return
+
+    old_key = haircut_model.image_key
+    haircut_model.image_url = upload_result["url"]
+    haircut_model.image_key = upload_result["key"]
+    haircut_model.image_status = IMAGE_READY if upload_result["variants_ready"] else IMAGE_FAILED
+    db.session.commit()
+    cache.invalidate('haircuts', model_id)
+
+    if old_key and old_key != upload_result["key"]:
+        delete_image(old_key)
+
+
+def _image_processed(model_id, key, ready):
+    """Record how a queued upload (``key=None``) or the variants of a claimed
+    image ended; a later image replacing ``key`` in between wins."""
+    haircut_model = Haircut.query.get(model_id)
+    if not haircut_model or (key is not None and haircut_model.image_key != key):
+        return
+
+    haircut_model.image_status = IMAGE_READY if ready else IMAGE_FAILED
+    db.session.commit()
+    cache.invalidate('haircuts', model_id)
+
 
 @haircut_bp.route('/', methods=['GET'], strict_slashes=False)
 @swag_from(get_doc_path('haircut/get_list.yml'))
+@cache.cached('haircuts', query_args=('page', 'limit', 'cursor', 'q', 'sort', 'fields'))
 def get_models():
     try:
         page = request.args.get("page", 1, type=int)
         limit = request.args.get("limit", 10, type=int)
+        cursor = request.args.get("cursor")
+        q = request.args.get("q", "").strip()
+        sort = request.args.get("sort")
+
+        sort_column, descending = HAIRCUT_SORT.parse(sort)
+        view = HAIRCUT_VIEW.only(request.args.get("fields"), keep=(sort_column.key,))
 
-        pagination = Haircut.query \
-            .filter(Haircut.deleted_at.is_(None)) \
-            .order_by(Haircut.choosen_count.desc()) \
-            .paginate(page=page, per_page=limit, error_out=False)
+        query = catalog_query(view)
 
-        data = transform_data(pagination.items)
+        if q:
+            if cursor is not None:
+                return response.bad_request("cursor cannot be combined with q, use page")
+            order_by = (sort_column, Haircut.id, descending) if sort else None
+            items, pagination = search_page(haircut_index, query, q, page, limit, order_by)
+        else:
+            items, pagination = paginate(query, page, limit, cursor,
+                                         order_by=(sort_column, Haircut.id), descending=descending)
+
+        data = view.dump_many(items)
 
         return response.ok({
             "data": data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": pagination.total
-            }
+            "pagination": pagination
         }, "Successfully retrieved haircut models")
 
+    except (InvalidCursor, InvalidSort, InvalidFields, InvalidSearch) as e:
+        return response.bad_request(str(e))
     except Exception:
         return response.internal_server_error("Internal server error")
 
 
 @haircut_bp.route('/<string:model_id>', methods=['GET'], strict_slashes=False)
 @swag_from(get_doc_path('haircut/get_detail.yml'))
+@cache.cached('haircuts', view_arg='model_id')
 def get_model_by_id(model_id):
     try:
         haircut_model = Haircut.query.get(model_id)
@@ -59,50 +120,71 @@ def get_model_by_id(model_id):
 
 @haircut_bp.route('/', methods=['POST'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('haircut/create.yml'))
 def create_model():
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != 'admin':
-            return response.unauthorized("Admin access required")
-        
         name = request.form.get("name")
         description = request.form.get("description")
         image = request.files.get("image")
+        uploaded_key = request.form.get("image_key")
 
         if not name or not description:
             return response.bad_request("Name and description are required")
 
-        if not image or image.filename == "":
-            return response.bad_request("Image is required")
+        try:
+            price = parse_price(request.form.get("price", 0))
+        except ValueError as e:
+            return response.bad_request(str(e))
 
-        upload_result = upload_image(name, image, "haircut-models")
-        if not upload_result:
-            return response.bad_request("Image upload failed")
-        
-        image_url = upload_result["url"]
-        image_key = upload_result["key"]
+        if (not image or image.filename == "") and not uploaded_key:
+            return response.bad_request("Image is required")
 
+        # image_url/image_key are NOT NULL; a queued upload fills them in
+        # through _attach_image once the object is stored.
         new_model = Haircut(
             name=name,
             description=description,
-            image_url=image_url,
-            image_key=image_key
+            image_url="",
+            image_key="",
+            image_status=IMAGE_PENDING,
+            price=price
         )
 
+        if uploaded_key:
+            upload_result = claim_uploaded_image(uploaded_key, "haircut-models")
+            new_model.image_url = upload_result["url"]
+            new_model.image_key = upload_result["key"]
+
         try:
             db.session.add(new_model)
             db.session.commit()
         except Exception:
-            delete_image(image_key)
+            if uploaded_key:
+                delete_image(uploaded_key)
             raise
 
+        cache.invalidate('haircuts')
+        price_table.refresh()
+        haircut_index.upsert(new_model)
+
+        if uploaded_key:
+            generate_variants_async(new_model.image_key,
+                                    on_complete=partial(_image_processed, new_model.id, new_model.image_key))
+        else:
+            upload_image_async(name, image, "haircut-models",
+                               on_complete=partial(_attach_image, new_model.id),
+                               on_error=partial(_image_processed, new_model.id, None, False),
+                               variants=True)
+
         return response.created(
             new_model.to_dict(),
             "Successfully created haircut model"
         )
 
+    except UploadError as e:
+        db.session.rollback()
+        return response.bad_request(str(e))
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
@@ -110,14 +192,10 @@ def create_model():
 
 @haircut_bp.route('/<string:model_id>', methods=['PUT'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('haircut/update.yml'))
 def update_model(model_id):
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != 'admin':
-            return response.unauthorized("Admin access required")
-        
         model_data = request.form.to_dict()
         
         haircut_model = Haircut.query.get(model_id)
@@ -127,32 +205,52 @@ def update_model(model_id):
         name = model_data.get("name", haircut_model.name)
         description = model_data.get("description", haircut_model.description)
         image = request.files.get("image")
-        choosen_count = int(haircut_model.choosen_count)
+        uploaded_key = model_data.get("image_key")
+        replaced_key = None
 
-        if image:
-            upload_result = upload_image(name, image, "haircut-models")
-
-            if not upload_result:
-                return response.bad_request("Image upload failed")
+        try:
+            price = parse_price(model_data.get("price", haircut_model.price))
+        except ValueError as e:
+            return response.bad_request(str(e))
 
-            new_image_url = upload_result["url"]
-            new_image_key = upload_result["key"]
+        if uploaded_key:
+            upload_result = claim_uploaded_image(uploaded_key, "haircut-models")
 
-            delete_image(haircut_model.image_key)
-            haircut_model.image_url = new_image_url
-            haircut_model.image_key = new_image_key
+            replaced_key = haircut_model.image_key
+            haircut_model.image_url = upload_result["url"]
+            haircut_model.image_key = upload_result["key"]
 
         haircut_model.name = name
         haircut_model.description = description
-        haircut_model.choosen_count = int(choosen_count)
+        haircut_model.price = price
+        if uploaded_key or image:
+            haircut_model.image_status = IMAGE_PENDING
 
         db.session.commit()
+        cache.invalidate('haircuts', model_id)
+        price_table.refresh()
+        haircut_index.upsert(haircut_model)
+
+        if replaced_key and replaced_key != uploaded_key:
+            delete_image(replaced_key)
+
+        if uploaded_key:
+            generate_variants_async(haircut_model.image_key,
+                                    on_complete=partial(_image_processed, model_id, haircut_model.image_key))
+        elif image:
+            upload_image_async(name, image, "haircut-models",
+                               on_complete=partial(_attach_image, model_id),
+                               on_error=partial(_image_processed, model_id, None, False),
+                               variants=True)
 
         return response.ok(
             haircut_model.to_dict(),
             "Successfully updated haircut model"
         )
 
+    except UploadError as e:
+        db.session.rollback()
+        return response.bad_request(str(e))
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
@@ -160,20 +258,19 @@ def update_model(model_id):
 
 @haircut_bp.route('/<string:haircut_id>', methods=['DELETE'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('haircut/delete_soft.yml'))
 def delete_haircut(haircut_id):
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != 'admin':
-            return response.unauthorized("Admin access required")
-        
         haircut = Haircut.query.get(haircut_id)
         if not haircut:
             return response.not_found("Haircut not found")
 
         haircut.deleted_at = get_wib_time()
         db.session.commit()
+        cache.invalidate('haircuts', haircut_id)
+        price_table.refresh()
+        haircut_index.remove(haircut_id)
 
         return response.ok({}, "Haircut deleted successfully")
 
@@ -183,21 +280,21 @@ def delete_haircut(haircut_id):
 
 @haircut_bp.route('/hard/<string:model_id>', methods=['DELETE'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('haircut/delete_hard.yml'))
 def hard_delete_model(model_id):
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != 'admin':
-            return response.unauthorized("Admin access required")
-        
         haircut_model = Haircut.query.get(model_id)
         if not haircut_model:
             return response.not_found("Haircut model not found")
 
-        delete_image(haircut_model.image_key)
+        if haircut_model.image_key:
+            delete_image(haircut_model.image_key)
         db.session.delete(haircut_model)
         db.session.commit()
+        cache.invalidate('haircuts', model_id)
+        price_table.refresh()
+        haircut_index.remove(model_id)
 
         return response.ok(
             {},
@@ -1,45 +1,121 @@
+from datetime import datetime
+from functools import partial
 from flask import Blueprint, request
 from flask_jwt_extended import (jwt_required, get_jwt_identity)
-from sqlalchemy.orm import joinedload
+from sqlalchemy import update, tuple_
+from sqlalchemy.orm.exc import StaleDataError
 from flasgger import swag_from
-from app.extensions import socketio
+from app.extensions import emitter
 from app.models.haircut_transactions import HaircutTransaction
+from app.models.haircut import Haircut
 from app.models.user import User
+from app.modules.auth import require_admin
 from app.modules import response
-from app.modules.transform import transform_data
-from app.modules.upload_r2 import upload_image
+from app.modules.projection import Projection, InvalidFields
+from app.modules.pagination import paginate, Sorting, InvalidCursor, InvalidSort
+from app.modules import reporting
+from app.modules import export
+from app.modules.counters import choosen_counter, is_active
+from app.modules.slots import (availability, get_schedule, parse_reservation_time, validate_slot,
+                               reserve_slot, release_slot, release_slots, invalidate_day, InvalidSlot,
+                               SlotUnavailable)
+from app.modules.time import get_wib_time
+from app.modules.idempotency import idempotency
+from app.modules.status import (PAYMENT_STATUS, RESERVATION_STATUS, HAIRCUT_TRANSACTION_STATUSES,
+                                validate_changes, expect_version, InvalidStatus, InvalidTransition,
+                                ConcurrentUpdate)
+from app.modules.pricing import price_table, parse_flag, UnknownHaircut
+from app.modules.upload_r2 import upload_image_async, claim_uploaded_image, delete_image, UploadError
 from app.modules.swagger_utils import get_doc_path
 from app import db
 
 haircut_transaction_bp = Blueprint('haircut_transaction', __name__, url_prefix='/haircut-transactions')
 
+MAX_QUOTE_ITEMS = 100
+MAX_BATCH_IDS = 200
+RECEIPT_ATTEMPTS = 3
+CONFLICT_MESSAGE = "Transaction was modified by another request, reload it and try again"
+
+HAIRCUT_SUMMARY = Projection(Haircut, ['name', 'image_url'])
+
+TRANSACTION_VIEW = Projection(HaircutTransaction, relations={"haircut": HAIRCUT_SUMMARY})
+
+TRANSACTION_ADMIN_VIEW = Projection(HaircutTransaction, relations={
+    "user": Projection(User, ['name', 'email']),
+    "haircut": HAIRCUT_SUMMARY
+})
+
+
+TRANSACTION_SORT = Sorting(HaircutTransaction, ('created_at', 'reservation_time'), default='-created_at')
+
+
+def transactions_query(view, user_id=None):
+    """Unordered query behind the transaction lists; ``flask explain-check``
+    plans the same query."""
+    query = HaircutTransaction.query \
+        .options(*view.options())
+
+    if user_id:
+        query = query.filter(HaircutTransaction.user_id == user_id)
+
+    return query
+
+
+def _attach_receipt(transaction_id, upload_result):
+    # The admin may change the status while the upload runs; a stale
+    # version makes the commit fail, so reload and apply again.
+    for attempt in range(RECEIPT_ATTEMPTS):
+        haircut_transaction = HaircutTransaction.query.get(transaction_id)
+        if not haircut_transaction:
+            delete_image(upload_result['key'])
+            return
+
+        old_status = haircut_transaction.payment_status
+        haircut_transaction.receipt_url = upload_result['url']
+        haircut_transaction.receipt_key = upload_result['key']
+        if PAYMENT_STATUS.can(old_status, "received"):
+            haircut_transaction.payment_status = "received"
+            reporting.record_payment_status_change('haircut', haircut_transaction, old_status)
+
+        try:
+            db.session.commit()
+            break
+        except StaleDataError:
+            db.session.rollback()
+            if attempt == RECEIPT_ATTEMPTS - 1:
+                raise
+
+    emitter.emit('haircut_transaction_receipt_uploaded', {
+        "id": haircut_transaction.id,
+        "receipt_url": haircut_transaction.receipt_url
+    }, to='admin_room')
+
 @haircut_transaction_bp.route('/', methods=['GET'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('haircut_transaction/get_list.yml'))
 def get_haircut_transactions():
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != "admin":
-            return response.unauthorized("Admin access required")
         page = request.args.get("page", 1, type=int)
         limit = request.args.get("limit", 10, type=int)
+        cursor = request.args.get("cursor")
+
+        sort_column, descending = TRANSACTION_SORT.parse(request.args.get("sort"))
+        view = TRANSACTION_ADMIN_VIEW.only(request.args.get("fields"), keep=(sort_column.key,))
 
-        pagination = HaircutTransaction.query \
-            .options(joinedload(HaircutTransaction.user), joinedload(HaircutTransaction.haircut)) \
-            .order_by(HaircutTransaction.created_at.desc()) \
-            .paginate(page=page, per_page=limit, error_out=False)
+        query = transactions_query(view)
 
-        data = transform_data(pagination.items, relations={"user": ['name', 'email'], "haircut": ['name', 'image_url']})
+        items, pagination = paginate(query, page, limit, cursor,
+                                     order_by=(sort_column, HaircutTransaction.id), descending=descending)
+
+        data = view.dump_many(items)
         return response.ok({
             "data": data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": pagination.total
-            }
+            "pagination": pagination
         }, "Successfully retrieved haircut transactions")
 
+    except (InvalidCursor, InvalidSort, InvalidFields) as e:
+        return response.bad_request(str(e))
     except Exception:
         return response.internal_server_error("Internal server error")
 
@@ -49,12 +125,12 @@ def get_haircut_transactions():
 def get_haircut_transaction_by_id(transaction_id):
     try:
         haircut_transaction = HaircutTransaction.query \
-            .options(joinedload(HaircutTransaction.haircut)) \
+            .options(*TRANSACTION_VIEW.options()) \
             .get(transaction_id)
         if not haircut_transaction:
             return response.not_found("Haircut transaction not found")
         
-        data = transform_data([haircut_transaction], relations={"haircut": ['name', 'image_url']})[0]
+        data = TRANSACTION_VIEW.dump(haircut_transaction)
 
         return response.ok(
             data,
@@ -72,29 +148,94 @@ def get_haircut_transactions_by_user_id():
         user_id = get_jwt_identity()
         page = request.args.get("page", 1, type=int)
         limit = request.args.get("limit", 10, type=int)
+        cursor = request.args.get("cursor")
+
+        sort_column, descending = TRANSACTION_SORT.parse(request.args.get("sort"))
+        view = TRANSACTION_VIEW.only(request.args.get("fields"), keep=(sort_column.key,))
 
-        pagination = HaircutTransaction.query \
-            .options(joinedload(HaircutTransaction.haircut)) \
-            .filter(HaircutTransaction.user_id == user_id) \
-            .order_by(HaircutTransaction.created_at.desc()) \
-            .paginate(page=page, per_page=limit, error_out=False)
+        query = transactions_query(view, user_id)
 
-        data = transform_data(pagination.items, relations={"haircut": ['name', 'image_url']})
+        items, pagination = paginate(query, page, limit, cursor,
+                                     order_by=(sort_column, HaircutTransaction.id), descending=descending)
+
+        data = view.dump_many(items)
 
         return response.ok({
             "data": data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": pagination.total
-            }
+            "pagination": pagination
         }, "Successfully retrieved haircut transactions for user")
 
+    except (InvalidCursor, InvalidSort, InvalidFields) as e:
+        return response.bad_request(str(e))
+    except Exception:
+        return response.internal_server_error("Internal server error")
+
+@haircut_transaction_bp.route('/export', methods=['GET'], strict_slashes=False)
+@jwt_required()
+@require_admin()
+@swag_from(get_doc_path('haircut_transaction/export.yml'))
+def export_haircut_transactions():
+    try:
+        filters = export.parse_filters(request.args, ('payment_status', 'reservation_status'))
+        return export.haircut_transactions(filters)
+
+    except export.InvalidExport as e:
+        return response.bad_request(str(e))
+    except Exception:
+        return response.internal_server_error("Internal server error")
+
+@haircut_transaction_bp.route('/availability', methods=['GET'], strict_slashes=False)
+@swag_from(get_doc_path('haircut_transaction/availability.yml'))
+def get_availability():
+    try:
+        date = request.args.get("date")
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date() if date else get_wib_time().date()
+        except ValueError:
+            return response.bad_request("Invalid date, use YYYY-MM-DD")
+
+        return response.ok(
+            availability(day),
+            "Successfully retrieved availability"
+        )
+
+    except Exception:
+        return response.internal_server_error("Internal server error")
+
+@haircut_transaction_bp.route('/quote', methods=['POST'], strict_slashes=False)
+@swag_from(get_doc_path('haircut_transaction/quote.yml'))
+def quote_haircut_transactions():
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get("items"), list) or not data["items"]:
+            return response.bad_request("items must be a non-empty list")
+
+        if len(data["items"]) > MAX_QUOTE_ITEMS:
+            return response.bad_request(f"At most {MAX_QUOTE_ITEMS} items per quote")
+
+        for item in data["items"]:
+            if not isinstance(item, dict) or not isinstance(item.get("haircut_id"), str) or not item["haircut_id"]:
+                return response.bad_request("Each item needs a haircut_id string")
+            if not isinstance(item.get("hairwash", False), bool):
+                return response.bad_request("hairwash must be true or false")
+
+        quotes = price_table.quote_many([
+            (item["haircut_id"], item.get("hairwash", False)) for item in data["items"]
+        ])
+
+        return response.ok(
+            {"quotes": quotes},
+            "Successfully quoted haircut transactions"
+        )
+
+    except UnknownHaircut as e:
+        return response.not_found(f"Haircut not found: {e}")
     except Exception:
         return response.internal_server_error("Internal server error")
 
 @haircut_transaction_bp.route('/', methods=['POST'], strict_slashes=False)
 @jwt_required()
+@idempotency.idempotent('haircut-transactions')
 @swag_from(get_doc_path('haircut_transaction/create.yml'))
 def create_haircut_transaction():
     try:
@@ -104,39 +245,195 @@ def create_haircut_transaction():
         if not data:
             return response.bad_request("Request body is empty")
 
-        required_fields = ["haircut_id", "hairwash", "total_price", "reservation_time", "payment_method"]
+        required_fields = ["haircut_id", "reservation_time", "payment_method"]
         if not all(field in data for field in required_fields):
             return response.bad_request("Missing required fields")
 
+        if not isinstance(data["haircut_id"], str):
+            return response.bad_request("haircut_id must be a string")
+
+        reservation_time = parse_reservation_time(data["reservation_time"])
+        validate_slot(reservation_time, get_schedule())
+
+        # The client's total_price is ignored; the price table is the source of truth.
+        quote = price_table.quote(data["haircut_id"], parse_flag(data.get("hairwash", False)))
+
         new_transaction = HaircutTransaction(
             user_id=user_id,
             haircut_id=data["haircut_id"],
-            hairwash=True if data["hairwash"] == "True" else False,
-            reservation_time=data.get("reservation_time"),
+            hairwash=quote["hairwash"],
+            reservation_time=reservation_time,
             payment_method=data.get("payment_method", "cash"),
-            payment_status=data.get("payment_status", "unpaid"),
-            total_price=data["total_price"]
+            reservation_status=RESERVATION_STATUS.initial,
+            payment_status=PAYMENT_STATUS.initial,
+            total_price=quote["total_price"]
         )
 
         db.session.add(new_transaction)
+        db.session.flush()
+        reserve_slot(new_transaction.id, reservation_time)
+        reporting.record_haircut_transaction(new_transaction)
         db.session.commit()
+        invalidate_day(reservation_time)
+        choosen_counter.add(new_transaction.haircut_id, 1)
         
         emit_payload = {
             "id": new_transaction.id,
             "user_id": new_transaction.user_id,
         }
         
-        socketio.emit('new_haircut_transaction_created', emit_payload, to='admin_room')
+        emitter.emit('new_haircut_transaction_created', emit_payload, to='admin_room')
 
         return response.created(
             new_transaction.to_dict(),
             "Haircut transaction created successfully"
         )
+    except InvalidSlot as e:
+        return response.bad_request(str(e))
+    except UnknownHaircut:
+        return response.not_found("Haircut not found")
+    except SlotUnavailable as e:
+        db.session.rollback()
+        return response.conflict(str(e))
     except Exception as e:
         print(e)
         db.session.rollback()
         return response.internal_server_error("Internal server error")
 
+@haircut_transaction_bp.route('/batch', methods=['PUT'], strict_slashes=False)
+@jwt_required()
+@require_admin()
+@swag_from(get_doc_path('haircut_transaction/update_status_batch.yml'))
+def update_haircut_transaction_status_batch():
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return response.bad_request("Request body is empty")
+
+        ids = data.get("ids")
+        if not isinstance(ids, list) or not ids or not all(isinstance(item, str) for item in ids):
+            return response.bad_request("ids must be a non-empty list of transaction ids")
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > MAX_BATCH_IDS:
+            return response.bad_request(f"At most {MAX_BATCH_IDS} ids per batch")
+
+        changes = {field: data[field] for field in HAIRCUT_TRANSACTION_STATUSES if field in data}
+        if not changes:
+            return response.bad_request("reservation_status or payment_status is required")
+        for field, value in changes.items():
+            HAIRCUT_TRANSACTION_STATUSES[field].require_known(value)
+
+        rows = db.session.query(
+            HaircutTransaction.id,
+            HaircutTransaction.user_id,
+            HaircutTransaction.haircut_id,
+            HaircutTransaction.reservation_status,
+            HaircutTransaction.payment_status,
+            HaircutTransaction.reservation_time,
+            HaircutTransaction.total_price,
+            HaircutTransaction.created_at,
+            HaircutTransaction.version
+        ) \
+            .filter(HaircutTransaction.id.in_(ids)) \
+            .all()
+        found = {row.id: row for row in rows}
+
+        # Activity changes move the reservation slot like the single-item
+        # endpoint does; an uncancel whose slot is taken meanwhile is skipped.
+        updated, released, conflicts, deltas, days = [], [], {}, {}, {}
+        new_status = changes.get('reservation_status')
+        for row in rows:
+            try:
+                validate_changes(HAIRCUT_TRANSACTION_STATUSES, row, changes)
+            except InvalidTransition as e:
+                conflicts[row.id] = ("invalid_transition", str(e))
+                continue
+
+            was_active = is_active(row.reservation_status)
+            now_active = is_active(new_status) if new_status is not None else was_active
+
+            if now_active and not was_active:
+                try:
+                    reserve_slot(row.id, row.reservation_time)
+                except SlotUnavailable as e:
+                    conflicts[row.id] = ("conflict", str(e))
+                    continue
+            elif was_active and not now_active:
+                released.append(row.id)
+
+            updated.append(row)
+            if now_active != was_active:
+                deltas[row.haircut_id] = deltas.get(row.haircut_id, 0) + (now_active - was_active)
+                days[row.reservation_time.date()] = row.reservation_time
+
+        if updated:
+            # No row locks: every row must still carry the version read
+            # above, otherwise the whole batch is rolled back.
+            result = db.session.execute(
+                update(HaircutTransaction)
+                .where(tuple_(HaircutTransaction.id, HaircutTransaction.version)
+                       .in_([(row.id, row.version) for row in updated]))
+                .values(**changes, version=HaircutTransaction.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(updated):
+                db.session.rollback()
+                return response.conflict(CONFLICT_MESSAGE)
+
+            release_slots(released)
+            if 'payment_status' in changes:
+                reporting.record_payment_status_changes('haircut', updated, changes['payment_status'])
+        db.session.commit()
+
+        for moment in days.values():
+            invalidate_day(moment)
+        for haircut_id, delta in deltas.items():
+            choosen_counter.add(haircut_id, delta)
+
+        results = []
+        by_user = {}
+        for transaction_id in ids:
+            row = found.get(transaction_id)
+            if row is None:
+                results.append({"id": transaction_id, "result": "not_found"})
+                continue
+            if transaction_id in conflicts:
+                result, message = conflicts[transaction_id]
+                results.append({"id": transaction_id, "result": result, "message": message})
+                continue
+
+            state = {
+                "id": transaction_id,
+                "reservation_status": changes.get('reservation_status', row.reservation_status),
+                "payment_status": changes.get('payment_status', row.payment_status),
+                "version": row.version + 1
+            }
+            results.append({**state, "result": "updated"})
+            by_user.setdefault(row.user_id, []).append(state)
+
+        if new_status == "completed":
+            if by_user:
+                emitter.emit('haircut_transactions_completed', {
+                    "ids": [state["id"] for states in by_user.values() for state in states],
+                    "status": new_status
+                }, to='admin_room')
+        else:
+            for user_id, transactions in by_user.items():
+                emitter.emit('haircut_transactions_status_updated', {
+                    "transactions": transactions
+                }, to=f'user_{user_id}')
+
+        return response.ok({
+            "updated": len(updated),
+            "results": results
+        }, "Haircut transactions updated successfully")
+
+    except InvalidStatus as e:
+        return response.bad_request(str(e))
+    except Exception:
+        db.session.rollback()
+        return response.internal_server_error("Internal server error")
+
 @haircut_transaction_bp.route('/<string:transaction_id>', methods=['PUT'], strict_slashes=False)
 @jwt_required()
 @swag_from(get_doc_path('haircut_transaction/update_status.yml'))
@@ -149,30 +446,60 @@ def update_haircut_transaction_status(transaction_id):
         transaction_data = request.get_json()
         if not transaction_data:
             return response.bad_request("Request body is empty")
+
+        changes = {field: transaction_data[field] for field in HAIRCUT_TRANSACTION_STATUSES if field in transaction_data}
+        expect_version(haircut_transaction, transaction_data.get('version'))
+        validate_changes(HAIRCUT_TRANSACTION_STATUSES, haircut_transaction, changes)
         
-        haircut_transaction.reservation_status = transaction_data.get("reservation_status", haircut_transaction.reservation_status)
-        haircut_transaction.payment_status = transaction_data.get("payment_status", haircut_transaction.payment_status)
+        old_status = haircut_transaction.payment_status
+        was_active = is_active(haircut_transaction.reservation_status)
+        for field, value in changes.items():
+            setattr(haircut_transaction, field, value)
+        reporting.record_payment_status_change('haircut', haircut_transaction, old_status)
+
+        now_active = is_active(haircut_transaction.reservation_status)
+        if was_active and not now_active:
+            release_slot(haircut_transaction.id)
+        elif now_active and not was_active:
+            reserve_slot(haircut_transaction.id, haircut_transaction.reservation_time)
 
+        # Flushed as UPDATE ... WHERE id = :id AND version = :loaded_version
         db.session.commit()
+        if now_active != was_active:
+            invalidate_day(haircut_transaction.reservation_time)
+        choosen_counter.add(haircut_transaction.haircut_id, now_active - was_active)
         
         if transaction_data.get("reservation_status") == "completed":
             emit_payload = {
                 "id": haircut_transaction.id,
                 "status": haircut_transaction.reservation_status
             }
-            socketio.emit('haircut_transaction_completed', emit_payload, to='admin_room')
+            emitter.emit('haircut_transaction_completed', emit_payload, to='admin_room')
         else: 
-            socketio.emit('haircut_transaction_status_updated', {
+            emitter.emit('haircut_transaction_status_updated', {
                 "id": haircut_transaction.id,
                 "reservation_status": haircut_transaction.reservation_status,
-                "payment_status": haircut_transaction.payment_status
-            }, to = f'user_{haircut_transaction.user_id}')
+                "payment_status": haircut_transaction.payment_status,
+                "version": haircut_transaction.version
+            }, to=f'user_{haircut_transaction.user_id}')
 
         return response.ok(
             haircut_transaction.to_dict(),
             "Haircut transaction updated successfully"
         )
 
+    except InvalidStatus as e:
+        db.session.rollback()
+        return response.bad_request(str(e))
+    except InvalidTransition as e:
+        db.session.rollback()
+        return response.conflict(str(e))
+    except (ConcurrentUpdate, StaleDataError):
+        db.session.rollback()
+        return response.conflict(CONFLICT_MESSAGE)
+    except SlotUnavailable as e:
+        db.session.rollback()
+        return response.conflict(str(e))
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
@@ -192,55 +519,57 @@ def upload_receipt(transaction_id):
             return response.unauthorized("You are not authorized to upload receipt for this transaction")
 
         file = request.files.get('receipt')
-        if not file:
+        uploaded_key = request.form.get('receipt_key')
+        if not file and not uploaded_key:
             return response.bad_request("No receipt file provided")
-        
-        result = upload_image(name=f"receipt-{transaction_id}", file=file, folder="haircut-receipts")
-        if not result:
-            return response.internal_server_error("Failed to upload receipt")
-        
-        haircut_transaction.receipt_url = result['url']
-        haircut_transaction.receipt_key = result['key']
-        haircut_transaction.payment_status = "received"
-        
-        db.session.commit()
-        
-        socketio.emit('haircut_transaction_receipt_uploaded', {
-            "id": haircut_transaction.id,
-            "receipt_url": haircut_transaction.receipt_url
-        }, to='admin_room')
+
+        if uploaded_key:
+            _attach_receipt(transaction_id, claim_uploaded_image(uploaded_key, "haircut-receipts"))
+            message = "Receipt uploaded successfully"
+        else:
+            upload_image_async(name=f"receipt-{transaction_id}", file=file, folder="haircut-receipts",
+                               on_complete=partial(_attach_receipt, transaction_id))
+            message = "Receipt is being uploaded"
 
         return response.ok(
             haircut_transaction.to_dict(),
-            "Receipt uploaded successfully"
+            message
         )
 
+    except UploadError as e:
+        return response.bad_request(str(e))
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
 
 @haircut_transaction_bp.route('/<string:transaction_id>', methods=['DELETE'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('haircut_transaction/delete.yml'))
 def delete_haircut_transaction(transaction_id):
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if current_user.role != "admin":
-            return response.unauthorized("Admin access required")
-        
         haircut_transaction = HaircutTransaction.query.get(transaction_id)
         if not haircut_transaction:
             return response.not_found("Haircut transaction not found")
 
+        reporting.record_haircut_transaction(haircut_transaction, sign=-1)
+        haircut_id = haircut_transaction.haircut_id
+        reservation_time = haircut_transaction.reservation_time
+        was_active = is_active(haircut_transaction.reservation_status)
+
         db.session.delete(haircut_transaction)
         db.session.commit()
+        invalidate_day(reservation_time)
+        choosen_counter.add(haircut_id, -was_active)
 
         return response.ok(
             {},
             "Haircut transaction deleted successfully"
         )
 
+    except StaleDataError:
+        db.session.rollback()
+        return response.conflict(CONFLICT_MESSAGE)
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
\ No newline at end of file
@@ -1,46 +1,119 @@
+from functools import partial
 from flask import Blueprint, request
-from flask_jwt_extended import (jwt_required, get_jwt_identity)
+from flask_jwt_extended import jwt_required
 from flasgger import swag_from
 from app.models.product import Product
 from app.modules import response
-from app.modules.transform import transform_data
-from app.modules.upload_r2 import delete_image, upload_image
+from app.modules.projection import Projection, InvalidFields
+from app.modules.image_variants import variant_urls, IMAGE_PENDING, IMAGE_READY, IMAGE_FAILED
+from app.modules.pagination import paginate, Sorting, InvalidCursor, InvalidSort
+from app.modules.upload_r2 import (delete_image, upload_image_async, claim_uploaded_image, generate_variants_async,
+                                  UploadError)
 from app.modules.time import get_wib_time
 from app.modules.swagger_utils import get_doc_path
 from app import db
-from app.models.user import User
+from app.extensions import cache
+from app.modules.auth import require_admin
+from app.modules.search import product_index, search_page, InvalidSearch
 
 product_bp = Blueprint('product', __name__, url_prefix='/products')
 
+PRODUCT_VIEW = Projection(Product, computed={'variants': lambda product: variant_urls(product.image_key, product.image_status)},
+                          requires={'variants': ('image_key', 'image_status')})
+
+PRODUCT_SORT = Sorting(Product, ('created_at', 'price'), default='-created_at')
+
+
+def catalog_query(view, min_price=None, max_price=None, in_stock=False):
+    """Unordered query of the live catalog; ``flask explain-check`` plans
+    the same query."""
+    query = Product.query \
+        .options(*view.options()) \
+        .filter(Product.deleted_at.is_(None))
+
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if in_stock:
+        query = query.filter(Product.stock > 0)
+
+    return query
+
+
+def _attach_image(product_id, upload_result):
+    product = Product.query.get(product_id)
+    if not product:
+        delete_image(upload_result["key"])
+        return
+
+    old_key = product.image_key
+    product.image_url = upload_result["url"]
+    product.image_key = upload_result["key"]
+    product.image_status = IMAGE_READY if upload_result["variants_ready"] else IMAGE_FAILED
+    db.session.commit()
+    cache.invalidate('products', product_id)
+
+    if old_key and old_key != upload_result["key"]:
+        delete_image(old_key)
+
+
+def _image_processed(product_id, key, ready):
+    """Record how a queued upload (``key=None``) or the variants of a claimed
+    image ended; a later image replacing ``key`` in between wins."""
+    product = Product.query.get(product_id)
+    if not product or (key is not None and product.image_key != key):
+        return
+
+    product.image_status = IMAGE_READY if ready else IMAGE_FAILED
+    db.session.commit()
+    cache.invalidate('products', product_id)
+
 
 @product_bp.route('/', methods=['GET'], strict_slashes=False)
 @swag_from(get_doc_path('product/get_list.yml'))
+@cache.cached('products', query_args=('page', 'limit', 'cursor', 'q', 'min_price', 'max_price', 'in_stock', 'sort', 'fields'))
 def get_products():
     try:
         page = request.args.get("page", 1, type=int)
         limit = request.args.get("limit", 10, type=int)
+        cursor = request.args.get("cursor")
+        q = request.args.get("q", "").strip()
+        min_price = request.args.get("min_price", type=float)
+        max_price = request.args.get("max_price", type=float)
+        in_stock = request.args.get("in_stock", "").lower() in ("true", "1")
+        sort = request.args.get("sort")
+
+        sort_column, descending = PRODUCT_SORT.parse(sort)
+        view = PRODUCT_VIEW.only(request.args.get("fields"), keep=(sort_column.key,))
+
+        query = catalog_query(view, min_price, max_price, in_stock)
 
-        pagination = Product.query\
-            .filter(Product.deleted_at.is_(None)) \
-            .paginate(page=page, per_page=limit, error_out=False)
+        if q:
+            if cursor is not None:
+                return response.bad_request("cursor cannot be combined with q, use page")
+            order_by = (sort_column, Product.id, descending) if sort else None
+            items, pagination = search_page(product_index, query, q, page, limit, order_by)
+        else:
+            items, pagination = paginate(query, page, limit, cursor,
+                                         order_by=(sort_column, Product.id), descending=descending)
 
-        data = transform_data(pagination.items)
+        data = view.dump_many(items)
 
         return response.ok({
             "data": data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": pagination.total
-            }
+            "pagination": pagination
         }, "Successfully retrieved products")
 
+    except (InvalidCursor, InvalidSort, InvalidFields, InvalidSearch) as e:
+        return response.bad_request(str(e))
     except Exception:
         return response.internal_server_error("Internal server error")
 
 
 @product_bp.route('/<string:product_id>', methods=['GET'], strict_slashes=False)
 @swag_from(get_doc_path('product/get_detail.yml'))
+@cache.cached('products', view_arg='product_id')
 def get_product_by_id(product_id):
     try:
         product = Product.query.get(product_id)
@@ -58,51 +131,64 @@ def get_product_by_id(product_id):
 
 @product_bp.route('/', methods=['POST'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('product/create.yml'))
 def create_product():
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != 'admin':
-            return response.unauthorized("Admin access required")
-        
         name = request.form.get("name")
         price = request.form.get("price")
         description = request.form.get("description")
         stock = request.form.get("stock", 0)
         image = request.files.get("image")
+        uploaded_key = request.form.get("image_key")
 
         if not name or not price:
             return response.bad_request("Name and price are required")
 
-        upload_result = upload_image(name, image, "products")
-        if not upload_result:
-            return response.bad_request("Image upload failed")
-
-        image_url = upload_result["url"]
-        image_key = upload_result["key"]
+        if not image and not uploaded_key:
+            return response.bad_request("Image is required")
 
         new_product = Product(
             name=name,
             description=description,
             price=float(price),
-            image_url=image_url,
-            image_key=image_key,
-            stock=int(stock)
+            stock=int(stock),
+            image_status=IMAGE_PENDING
         )
 
+        if uploaded_key:
+            upload_result = claim_uploaded_image(uploaded_key, "products")
+            new_product.image_url = upload_result["url"]
+            new_product.image_key = upload_result["key"]
+
         try:
             db.session.add(new_product)
             db.session.commit()
         except Exception:
-            delete_image(image_key)
+            if uploaded_key:
+                delete_image(uploaded_key)
             raise
 
+        cache.invalidate('products')
+        product_index.upsert(new_product)
+
+        if uploaded_key:
+            generate_variants_async(new_product.image_key,
+                                    on_complete=partial(_image_processed, new_product.id, new_product.image_key))
+        elif image:
+            upload_image_async(name, image, "products",
+                               on_complete=partial(_attach_image, new_product.id),
+                               on_error=partial(_image_processed, new_product.id, None, False),
+                               variants=True)
+
         return response.created(
             new_product.to_dict(),
             "Product created successfully"
         )
 
+    except UploadError as e:
+        db.session.rollback()
+        return response.bad_request(str(e))
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
@@ -110,14 +196,10 @@ def create_product():
 
 @product_bp.route('/<string:product_id>', methods=['PUT'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('product/update.yml'))
 def update_product(product_id):
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != 'admin':
-            return response.unauthorized("Admin access required")
-        
         product_data = request.form.to_dict()
         if not product_data and not request.files:
             return response.bad_request("Request body is empty")
@@ -132,35 +214,50 @@ def update_product(product_id):
         
         description = product_data.get("description", product.description)
         image = request.files.get("image")
+        uploaded_key = product_data.get("image_key")
+        replaced_key = None
         
         stock_raw = product_data.get("stock", product.stock)
         stock = int(stock_raw)
 
-        if image:
-            upload_result = upload_image(name, image, "products")
-            
-            if not upload_result:
-                return response.bad_request("Image upload failed")
+        if uploaded_key:
+            upload_result = claim_uploaded_image(uploaded_key, "products")
 
-            new_image_url = upload_result["url"]
-            new_image_key = upload_result["key"]
-
-            delete_image(product.image_key)
-            product.image_url = new_image_url
-            product.image_key = new_image_key
+            replaced_key = product.image_key
+            product.image_url = upload_result["url"]
+            product.image_key = upload_result["key"]
 
         product.name = name
         product.price = price
         product.description = description
         product.stock = stock
+        if uploaded_key or image:
+            product.image_status = IMAGE_PENDING
 
         db.session.commit()
+        cache.invalidate('products', product_id)
+        product_index.upsert(product)
+
+        if replaced_key and replaced_key != uploaded_key:
+            delete_image(replaced_key)
+
+        if uploaded_key:
+            generate_variants_async(product.image_key,
+                                    on_complete=partial(_image_processed, product_id, product.image_key))
+        elif image:
+            upload_image_async(name, image, "products",
+                               on_complete=partial(_attach_image, product_id),
+                               on_error=partial(_image_processed, product_id, None, False),
+                               variants=True)
 
         return response.ok(
             product.to_dict(),
             "Product updated successfully"
         )
 
+    except UploadError as e:
+        db.session.rollback()
+        return response.bad_request(str(e))
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
@@ -168,20 +265,18 @@ def update_product(product_id):
 
 @product_bp.route('/<string:product_id>', methods=['DELETE'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('product/delete_soft.yml'))
 def delete_product(product_id):
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != 'admin':
-            return response.unauthorized("Admin access required")
-        
         product = Product.query.get(product_id)
         if not product:
             return response.not_found("Product not found")
 
         product.deleted_at = get_wib_time()
         db.session.commit()
+        cache.invalidate('products', product_id)
+        product_index.remove(product_id)
 
         return response.ok({}, "Product deleted successfully")
 
@@ -192,22 +287,21 @@ def delete_product(product_id):
 
 @product_bp.route('/hard/<string:product_id>', methods=['DELETE'], strict_slashes=False)
 @jwt_required()
+@require_admin()
 @swag_from(get_doc_path('product/delete_hard.yml'))
 def hard_delete_product(product_id):
     try:
-        uid = get_jwt_identity()
-        current_user = User.query.get(uid)
-        if current_user.role != 'admin':
-            return response.unauthorized("Admin access required")
-        
         product = Product.query.get(product_id)
         if not product:
             return response.not_found("Product not found")
 
-        delete_image(product.image_key)
+        if product.image_key:
+            delete_image(product.image_key)
 
         db.session.delete(product)
         db.session.commit()
+        cache.invalidate('products', product_id)
+        product_index.remove(product_id)
 
         return response.ok({}, "Product deleted successfully")
 
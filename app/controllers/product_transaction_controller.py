@@ -1,63 +1,131 @@
+from functools import partial
 from flask import Blueprint, request
 from flask_jwt_extended import (jwt_required, get_jwt_identity)
-from app.extensions import socketio
+from app.extensions import emitter, cache
+from sqlalchemy import insert, update, tuple_
 from sqlalchemy.orm import joinedload
-from datetime import datetime
+from sqlalchemy.orm.exc import StaleDataError
 from flasgger import swag_from
 
 from app import db
+from app.controllers.cart_controller import cart_query
 from app.models.product_transactions import ProductTransaction, TransactionItem, CartItem
-from app.models.user import User
+from app.modules.auth import require_admin, current_user
 from app.models.product import Product
+from app.models.user import User
 from app.modules import response
-from app.modules.upload_r2 import upload_image
-from app.modules.transform import transform_data
+from app.modules.upload_r2 import upload_image_async, claim_uploaded_image, delete_image, UploadError
+from app.modules.projection import Projection, InvalidFields
+from app.modules.pagination import paginate, Sorting, InvalidCursor, InvalidSort
+from app.modules.stock import reserve_stock, release_stock, StockReservationError
+from app.modules import reporting
+from app.modules import export
 from app.modules.swagger_utils import get_doc_path
+from app.modules.time import get_wib_time
+from app.modules.idempotency import idempotency
+from app.modules.status import (PAYMENT_STATUS, EXPEDITION_STATUS, PRODUCT_TRANSACTION_STATUSES,
+                                validate_changes, expect_version, InvalidStatus, InvalidTransition,
+                                ConcurrentUpdate)
 
 product_transaction_bp = Blueprint('product_transaction', __name__, url_prefix='/product-transactions')
 
+MAX_BATCH_IDS = 200
+RECEIPT_ATTEMPTS = 3
+CONFLICT_MESSAGE = "Transaction was modified by another request, reload it and try again"
+
+ITEM_VIEW = Projection(
+    TransactionItem,
+    ['id', 'product_id', 'quantity', 'price_at_purchase'],
+    computed={
+        'product_name': lambda item: item.product.name if item.product else "Unknown Product",
+        'product_image': lambda item: item.product.image_url if item.product else None,
+        'subtotal': lambda item: item.quantity * item.price_at_purchase
+    },
+    load={'product': Projection(Product, ['name', 'image_url'])}
+)
+
+TRANSACTION_VIEW = Projection(ProductTransaction, relations={"items": ITEM_VIEW})
+
+TRANSACTION_ADMIN_VIEW = Projection(ProductTransaction, relations={
+    "user": Projection(User, ['name', 'email']),
+    "items": ITEM_VIEW
+})
+
+
+TRANSACTION_SORT = Sorting(ProductTransaction, ('created_at',), default='-created_at')
+
+
+def transactions_query(view, user_id=None):
+    """Unordered query behind the transaction lists; ``flask explain-check``
+    plans the same query."""
+    query = ProductTransaction.query \
+        .options(*view.options())
+
+    if user_id:
+        query = query.filter(ProductTransaction.user_id == user_id)
+
+    return query
+
+
+def _attach_receipt(transaction_id, upload_result):
+    # The admin may change the status while the upload runs; a stale
+    # version makes the commit fail, so reload and apply again.
+    for attempt in range(RECEIPT_ATTEMPTS):
+        product_transaction = ProductTransaction.query.get(transaction_id)
+        if not product_transaction:
+            delete_image(upload_result['key'])
+            return
+
+        old_status = product_transaction.payment_status
+        product_transaction.receipt_url = upload_result['url']
+        product_transaction.receipt_key = upload_result['key']
+        if PAYMENT_STATUS.can(old_status, "received"):
+            product_transaction.payment_status = "received"
+            reporting.record_payment_status_change('product', product_transaction, old_status)
+
+        try:
+            db.session.commit()
+            break
+        except StaleDataError:
+            db.session.rollback()
+            if attempt == RECEIPT_ATTEMPTS - 1:
+                raise
+
+    emitter.emit('product_transaction_receipt_uploaded', {
+        "id": product_transaction.id,
+        "receipt_url": product_transaction.receipt_url
+    }, to='admin_room')
+
 
 @product_transaction_bp.route('/', methods=['GET'], strict_slashes=False)
 @jwt_required()
+@require_admin("You are not allowed to access this resource")
 @swag_from(get_doc_path('product_transaction/get_list.yml'))
 def get_product_transactions():
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return response.unauthorized("You are not allowed to access this resource")
-        
         page = request.args.get("page", 1, type=int)
         limit = request.args.get("limit", 10, type=int)
+        cursor = request.args.get("cursor")
         
         filter_user_id = request.args.get("user_id")
 
-        query = ProductTransaction.query \
-            .options(
-                joinedload(ProductTransaction.user),
-                joinedload(ProductTransaction.items).joinedload(TransactionItem.product)
-            ) \
-            .order_by(ProductTransaction.created_at.desc())
+        sort_column, descending = TRANSACTION_SORT.parse(request.args.get("sort"))
+        view = TRANSACTION_ADMIN_VIEW.only(request.args.get("fields"), keep=(sort_column.key,))
 
-        if filter_user_id:
-            query = query.filter(ProductTransaction.user_id == filter_user_id)
+        query = transactions_query(view, filter_user_id)
 
-        pagination = query.paginate(page=page, per_page=limit, error_out=False)
+        items, pagination = paginate(query, page, limit, cursor,
+                                     order_by=(sort_column, ProductTransaction.id), descending=descending)
 
-        data = transform_data(pagination.items, relations={
-            "user": ['name', 'email'], 
-            "items": [] 
-        })
+        data = view.dump_many(items)
         
         return response.ok({
             "data": data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": pagination.total
-            }
+            "pagination": pagination
         }, "Successfully retrieved product transactions")
 
+    except (InvalidCursor, InvalidSort, InvalidFields) as e:
+        return response.bad_request(str(e))
     except Exception as e:
         print(e)
         return response.internal_server_error("Internal server error")
@@ -68,11 +136,8 @@ def get_product_transactions():
 @swag_from(get_doc_path('product_transaction/get_detail.yml'))
 def get_product_transaction_by_id(transaction_id):
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
         product_transaction = ProductTransaction.query \
-            .options(joinedload(ProductTransaction.items).joinedload(TransactionItem.product)) \
+            .options(*TRANSACTION_ADMIN_VIEW.options()) \
             .get(transaction_id)
         
         if not product_transaction:
@@ -81,10 +146,7 @@ def get_product_transaction_by_id(transaction_id):
         if product_transaction.user_id != current_user.id and current_user.role != 'admin':
             return response.unauthorized("You are not allowed to view this transaction")
 
-        data = transform_data([product_transaction], relations={
-            "items": [],
-            "user": ['name', 'email']
-        })[0]
+        data = TRANSACTION_ADMIN_VIEW.dump(product_transaction)
         
         return response.ok(
             data,
@@ -104,24 +166,41 @@ def get_my_transactions():
 
         page = request.args.get("page", 1, type=int)
         limit = request.args.get("limit", 10, type=int)
+        cursor = request.args.get("cursor")
+
+        sort_column, descending = TRANSACTION_SORT.parse(request.args.get("sort"))
+        view = TRANSACTION_VIEW.only(request.args.get("fields"), keep=(sort_column.key,))
 
-        pagination = ProductTransaction.query \
-            .options(joinedload(ProductTransaction.items).joinedload(TransactionItem.product)) \
-            .filter(ProductTransaction.user_id == user_id) \
-            .order_by(ProductTransaction.created_at.desc()) \
-            .paginate(page=page, per_page=limit, error_out=False)
+        query = transactions_query(view, user_id)
 
-        data = transform_data(pagination.items, relations={"items": []})
+        items, pagination = paginate(query, page, limit, cursor,
+                                     order_by=(sort_column, ProductTransaction.id), descending=descending)
+
+        data = view.dump_many(items)
 
         return response.ok({
             "data": data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": pagination.total
-            }
+            "pagination": pagination
         }, "Successfully retrieved your transactions")
 
+    except (InvalidCursor, InvalidSort, InvalidFields) as e:
+        return response.bad_request(str(e))
+    except Exception as e:
+        print(e)
+        return response.internal_server_error("Internal server error")
+
+
+@product_transaction_bp.route('/export', methods=['GET'], strict_slashes=False)
+@jwt_required()
+@require_admin("You are not allowed to access this resource")
+@swag_from(get_doc_path('product_transaction/export.yml'))
+def export_product_transactions():
+    try:
+        filters = export.parse_filters(request.args, ('payment_status', 'expedition_status'))
+        return export.product_transactions(filters)
+
+    except export.InvalidExport as e:
+        return response.bad_request(str(e))
     except Exception as e:
         print(e)
         return response.internal_server_error("Internal server error")
@@ -129,6 +208,7 @@ def get_my_transactions():
 
 @product_transaction_bp.route('/checkout', methods=['POST'], strict_slashes=False)
 @jwt_required()
+@idempotency.idempotent('checkout')
 @swag_from(get_doc_path('product_transaction/checkout.yml'))
 def create_product_transaction():
     try:
@@ -150,38 +230,33 @@ def create_product_transaction():
             product = Product.query.get(product_id)
             if not product:
                 return response.not_found("Product not found")
-            
-            if product.stock < quantity:
-                return response.bad_request(f"Insufficient stock for '{product.name}'")
 
             checkout_items.append({
                 'product': product,
                 'quantity': quantity,
-                'cart_item_obj': None 
+                'cart_item_id': None
             })
 
             grand_total = product.price * quantity
 
         else:
-            cart_items_db = CartItem.query.filter_by(user_id=user_id).all()
+            cart_items_db = cart_query(user_id).all()
             
             if not cart_items_db:
                 return response.bad_request("Cart is empty and no direct product specified.")
 
             for item in cart_items_db:
                 if not item.product: continue
-                
-                if item.product.stock < item.quantity:
-                    return response.bad_request(f"Insufficient stock for '{item.product.name}'")
 
                 checkout_items.append({
                     'product': item.product,
                     'quantity': item.quantity,
-                    'cart_item_obj': item 
+                    'cart_item_id': item.id
                 })
                 
                 grand_total += item.product.price * item.quantity
 
+        reserve_stock((item['product'].id, item['quantity']) for item in checkout_items)
 
         new_transaction = ProductTransaction(
             user_id=user_id,
@@ -189,44 +264,54 @@ def create_product_transaction():
             expedition_cost=data.get("expedition_cost", 0),
             expedition_service=data.get("expedition_service", "JNE"),
             payment_method=data.get("payment_method", "cod"),
-            payment_status=data.get("payment_status", "unpaid"),
+            payment_status=PAYMENT_STATUS.initial,
             shipping_address=data.get("shipping_address"),
-            expedition_status="pending"
+            expedition_status=EXPEDITION_STATUS.initial
         )
 
         db.session.add(new_transaction)
         db.session.flush()
 
-        for item_data in checkout_items:
-            prod = item_data['product']
-            qty = item_data['quantity']
-            cart_obj = item_data['cart_item_obj']
-
-            prod.stock -= qty
-            
-            new_item = TransactionItem(
-                transaction_id=new_transaction.id,
-                product_id=prod.id,
-                quantity=qty,
-                price_at_purchase=prod.price
-            )
-            db.session.add(new_item)
-
-            if cart_obj:
-                db.session.delete(cart_obj)
+        db.session.execute(insert(TransactionItem), [
+            {
+                'transaction_id': new_transaction.id,
+                'product_id': item_data['product'].id,
+                'quantity': item_data['quantity'],
+                'price_at_purchase': item_data['product'].price
+            } for item_data in checkout_items
+        ])
+
+        reporting.record_product_transaction(new_transaction, [
+            (item['product'].id, item['quantity'], item['product'].price) for item in checkout_items
+        ])
+
+        cart_item_ids = [item['cart_item_id'] for item in checkout_items if item['cart_item_id']]
+        if cart_item_ids:
+            CartItem.query \
+                .filter(CartItem.user_id == user_id, CartItem.id.in_(cart_item_ids)) \
+                .delete(synchronize_session=False)
+
+        # Serialise before commit: the products are still loaded, so the
+        # items resolve with one SELECT instead of a refresh per line.
+        transaction_data = new_transaction.to_dict()
+        product_ids = [item['product'].id for item in checkout_items]
 
         db.session.commit()
+        cache.invalidate('products', *product_ids)
         
-        socketio.emit('new_product_transaction_created', {
-            "id": new_transaction.id,
-            "total_price": new_transaction.total_price
+        emitter.emit('new_product_transaction_created', {
+            "id": transaction_data['id'],
+            "total_price": transaction_data['total_price']
         }, to='admin_room')
         
         return response.created(
-            new_transaction.to_dict(),
+            transaction_data,
             "Transaction created successfully"
         )
 
+    except StockReservationError as e:
+        db.session.rollback()
+        return response.bad_request(f"Insufficient stock for {e}")
     except Exception as e:
         db.session.rollback()
         print(f"Checkout Error: {e}")
@@ -247,34 +332,130 @@ def upload_receipt(transaction_id):
             return response.unauthorized("You are not authorized to upload receipt for this transaction")
 
         file = request.files.get('receipt')
-        if not file:
+        uploaded_key = request.form.get('receipt_key')
+        if not file and not uploaded_key:
             return response.bad_request("No receipt file provided")
-        
-        result = upload_image(name=f"receipt-{transaction_id}", file=file, folder="product-receipts")
-        if not result:
-            return response.internal_server_error("Failed to upload receipt")
-        
-        product_transaction.receipt_url = result['url']
-        product_transaction.receipt_key = result['key']
-        product_transaction.payment_status = "received"
-        
-        db.session.commit()
-        
-        socketio.emit('product_transaction_receipt_uploaded', {
-            "id": product_transaction.id,
-            "receipt_url": product_transaction.receipt_url
-        }, to='admin_room')
+
+        if uploaded_key:
+            _attach_receipt(transaction_id, claim_uploaded_image(uploaded_key, "product-receipts"))
+            message = "Receipt uploaded successfully"
+        else:
+            upload_image_async(name=f"receipt-{transaction_id}", file=file, folder="product-receipts",
+                               on_complete=partial(_attach_receipt, transaction_id))
+            message = "Receipt is being uploaded"
 
         return response.ok(
             product_transaction.to_dict(),
-            "Receipt uploaded successfully"
+            message
         )
 
+    except UploadError as e:
+        return response.bad_request(str(e))
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
 
 
+@product_transaction_bp.route('/batch', methods=['PUT'], strict_slashes=False)
+@jwt_required()
+@require_admin("You are not allowed to access this resource")
+@swag_from(get_doc_path('product_transaction/update_status_batch.yml'))
+def update_transaction_status_batch():
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return response.bad_request("Request body is empty")
+
+        ids = data.get("ids")
+        if not isinstance(ids, list) or not ids or not all(isinstance(item, str) for item in ids):
+            return response.bad_request("ids must be a non-empty list of transaction ids")
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > MAX_BATCH_IDS:
+            return response.bad_request(f"At most {MAX_BATCH_IDS} ids per batch")
+
+        changes = {field: data[field] for field in PRODUCT_TRANSACTION_STATUSES if field in data}
+        if not changes:
+            return response.bad_request("payment_status or expedition_status is required")
+        for field, value in changes.items():
+            PRODUCT_TRANSACTION_STATUSES[field].require_known(value)
+
+        rows = db.session.query(
+            ProductTransaction.id,
+            ProductTransaction.user_id,
+            ProductTransaction.payment_status,
+            ProductTransaction.expedition_status,
+            ProductTransaction.total_price,
+            ProductTransaction.created_at,
+            ProductTransaction.version
+        ) \
+            .filter(ProductTransaction.id.in_(ids)) \
+            .all()
+        found = {row.id: row for row in rows}
+
+        rejected = {}
+        for row in rows:
+            try:
+                validate_changes(PRODUCT_TRANSACTION_STATUSES, row, changes)
+            except InvalidTransition as e:
+                rejected[row.id] = str(e)
+        updated = [row for row in rows if row.id not in rejected]
+
+        if updated:
+            # No row locks: every row must still carry the version read
+            # above, otherwise the whole batch is rolled back.
+            result = db.session.execute(
+                update(ProductTransaction)
+                .where(tuple_(ProductTransaction.id, ProductTransaction.version)
+                       .in_([(row.id, row.version) for row in updated]))
+                .values(**changes, version=ProductTransaction.version + 1, updated_at=get_wib_time())
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != len(updated):
+                db.session.rollback()
+                return response.conflict(CONFLICT_MESSAGE)
+
+            if 'payment_status' in changes:
+                reporting.record_payment_status_changes('product', updated, changes['payment_status'])
+        db.session.commit()
+
+        results = []
+        by_user = {}
+        for transaction_id in ids:
+            row = found.get(transaction_id)
+            if row is None:
+                results.append({"id": transaction_id, "result": "not_found"})
+                continue
+            if transaction_id in rejected:
+                results.append({"id": transaction_id, "result": "invalid_transition", "message": rejected[transaction_id]})
+                continue
+
+            state = {
+                "id": transaction_id,
+                "payment_status": changes.get('payment_status', row.payment_status),
+                "expedition_status": changes.get('expedition_status', row.expedition_status),
+                "version": row.version + 1
+            }
+            results.append({**state, "result": "updated"})
+            by_user.setdefault(row.user_id, []).append(state)
+
+        for user_id, transactions in by_user.items():
+            emitter.emit('product_transactions_status_updated', {
+                "transactions": transactions
+            }, to=f'user_{user_id}')
+
+        return response.ok({
+            "updated": len(updated),
+            "results": results
+        }, "Transaction statuses updated successfully")
+
+    except InvalidStatus as e:
+        return response.bad_request(str(e))
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+        return response.internal_server_error("Internal server error")
+
+
 @product_transaction_bp.route('/<string:transaction_id>', methods=['PUT'], strict_slashes=False)
 @jwt_required()
 @swag_from(get_doc_path('product_transaction/update_status.yml'))
@@ -288,25 +469,42 @@ def update_transaction_status(transaction_id):
         if not data:
             return response.bad_request("Request body is empty")
 
-        if 'payment_status' in data:
-            product_transaction.payment_status = data['payment_status']
-        
-        if 'expedition_status' in data:
-            product_transaction.expedition_status = data['expedition_status']
+        changes = {field: data[field] for field in PRODUCT_TRANSACTION_STATUSES if field in data}
+        expect_version(product_transaction, data.get('version'))
+        validate_changes(PRODUCT_TRANSACTION_STATUSES, product_transaction, changes)
+
+        old_status = product_transaction.payment_status
+        for field, value in changes.items():
+            setattr(product_transaction, field, value)
+        product_transaction.updated_at = get_wib_time()
+        # Flushed once as UPDATE ... WHERE id = :id AND version = :loaded_version
+        # (the rollup upsert below may autoflush it early, so set every
+        # column first).
+        if 'payment_status' in changes:
+            reporting.record_payment_status_change('product', product_transaction, old_status)
 
-        product_transaction.updated_at = datetime.utcnow()
         db.session.commit()
         
-        socketio.emit('product_transaction_status_updated', {
+        emitter.emit('product_transaction_status_updated', {
             "id": product_transaction.id,
             "payment_status": product_transaction.payment_status,
-            "expedition_status": product_transaction.expedition_status
-        }, to = f'user_{product_transaction.user_id}')
+            "expedition_status": product_transaction.expedition_status,
+            "version": product_transaction.version
+        }, to=f'user_{product_transaction.user_id}')
 
         return response.ok(
             product_transaction.to_dict(),
             "Transaction status updated successfully"
         )
+    except InvalidStatus as e:
+        db.session.rollback()
+        return response.bad_request(str(e))
+    except InvalidTransition as e:
+        db.session.rollback()
+        return response.conflict(str(e))
+    except (ConcurrentUpdate, StaleDataError):
+        db.session.rollback()
+        return response.conflict(CONFLICT_MESSAGE)
     except Exception:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
@@ -318,22 +516,28 @@ def update_transaction_status(transaction_id):
 def delete_product_transaction(transaction_id):
     try:
         product_transaction = ProductTransaction.query \
-            .options(joinedload(ProductTransaction.items).joinedload(TransactionItem.product)) \
+            .options(joinedload(ProductTransaction.items)) \
             .get(transaction_id)
             
         if not product_transaction:
             return response.not_found("Product transaction not found")
 
-        for item in product_transaction.items:
-            item.product.stock += item.quantity
+        release_stock((item.product_id, item.quantity) for item in product_transaction.items)
+
+        restocked_ids = [item.product_id for item in product_transaction.items]
+        reporting.record_product_transaction(product_transaction, sign=-1)
 
         db.session.delete(product_transaction)
         db.session.commit()
+        cache.invalidate('products', *restocked_ids)
 
         return response.ok(
             {},
             "Product transaction deleted successfully"
         )
+    except StaleDataError:
+        db.session.rollback()
+        return response.conflict(CONFLICT_MESSAGE)
     except Exception as e:
         db.session.rollback()
         return response.internal_server_error("Internal server error")
\ No newline at end of file
@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required
+from flasgger import swag_from
+from sqlalchemy import func
+from app import db
+from app.models.report import SalesRollup, ProductSalesRollup, ReservationRollup
+from app.models.product import Product
+from app.models.haircut import Haircut
+from app.modules import response
+from app.modules.auth import require_admin
+from app.modules.reporting import PERIODS
+from app.modules.time import get_wib_time
+from app.modules.swagger_utils import get_doc_path
+
+report_bp = Blueprint('report', __name__, url_prefix='/reports')
+
+DEFAULT_RANGE_DAYS = 30
+
+
+class InvalidReportQuery(ValueError):
+    pass
+
+
+def _date_range():
+    """``start``/``end`` as inclusive YYYY-MM-DD dates, last 30 days by default."""
+    try:
+        end = request.args.get("end")
+        end = datetime.strptime(end, "%Y-%m-%d") if end else get_wib_time().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = request.args.get("start")
+        start = datetime.strptime(start, "%Y-%m-%d") if start else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        raise InvalidReportQuery("Invalid date, use YYYY-MM-DD")
+
+    if start > end:
+        raise InvalidReportQuery("start must not be after end")
+
+    return start, end + timedelta(days=1)
+
+
+def _period():
+    period = request.args.get("period", "day")
+    if period not in PERIODS:
+        raise InvalidReportQuery("period must be one of: " + ", ".join(PERIODS))
+    return period
+
+
+def _range_payload(start, end, period=None):
+    payload = {
+        "start": start.strftime("%Y-%m-%d"),
+        "end": (end - timedelta(days=1)).strftime("%Y-%m-%d")
+    }
+    if period:
+        payload["period"] = period
+    return payload
+
+
+@report_bp.route('/sales', methods=['GET'], strict_slashes=False)
+@jwt_required()
+@require_admin()
+@swag_from(get_doc_path('report/sales.yml'))
+def get_sales_report():
+    try:
+        start, end = _date_range()
+        period = _period()
+        source = request.args.get("source")
+
+        query = SalesRollup.query.filter(
+            SalesRollup.period == period,
+            SalesRollup.bucket >= start,
+            SalesRollup.bucket < end
+        )
+        if source:
+            query = query.filter(SalesRollup.source == source)
+
+        rows = query.order_by(SalesRollup.bucket).all()
+
+        totals = {}
+        for row in rows:
+            total = totals.setdefault(row.payment_status, {"transactions": 0, "revenue": 0})
+            total["transactions"] += row.transactions
+            total["revenue"] += row.revenue
+
+        return response.ok({
+            **_range_payload(start, end, period),
+            "data": [row.to_dict() for row in rows if row.transactions],
+            "totals": totals
+        }, "Successfully retrieved sales report")
+
+    except InvalidReportQuery as e:
+        return response.bad_request(str(e))
+    except Exception:
+        return response.internal_server_error("Internal server error")
+
+
+@report_bp.route('/products', methods=['GET'], strict_slashes=False)
+@jwt_required()
+@require_admin()
+@swag_from(get_doc_path('report/products.yml'))
+def get_product_report():
+    try:
+        start, end = _date_range()
+
+        units = func.sum(ProductSalesRollup.units).label("units")
+        rows = db.session.query(
+            ProductSalesRollup.product_id,
+            Product.name,
+            units,
+            func.sum(ProductSalesRollup.revenue).label("revenue")
+        ) \
+            .outerjoin(Product, Product.id == ProductSalesRollup.product_id) \
+            .filter(
+                ProductSalesRollup.period == 'day',
+                ProductSalesRollup.bucket >= start,
+                ProductSalesRollup.bucket < end
+            ) \
+            .group_by(ProductSalesRollup.product_id, Product.name) \
+            .having(units != 0) \
+            .order_by(units.desc()) \
+            .all()
+
+        return response.ok({
+            **_range_payload(start, end),
+            "data": [{
+                "product_id": row.product_id,
+                "product_name": row.name,
+                "units": int(row.units),
+                "revenue": float(row.revenue)
+            } for row in rows]
+        }, "Successfully retrieved product sales report")
+
+    except InvalidReportQuery as e:
+        return response.bad_request(str(e))
+    except Exception:
+        return response.internal_server_error("Internal server error")
+
+
+@report_bp.route('/reservations', methods=['GET'], strict_slashes=False)
+@jwt_required()
+@require_admin()
+@swag_from(get_doc_path('report/reservations.yml'))
+def get_reservation_report():
+    try:
+        start, end = _date_range()
+        period = _period()
+
+        in_range = (
+            ReservationRollup.bucket >= start,
+            ReservationRollup.bucket < end
+        )
+
+        reservations = func.sum(ReservationRollup.reservations).label("reservations")
+        hairwash = func.sum(ReservationRollup.hairwash).label("hairwash")
+        revenue = func.sum(ReservationRollup.revenue).label("revenue")
+
+        haircuts = db.session.query(ReservationRollup.haircut_id, Haircut.name, reservations, hairwash, revenue) \
+            .outerjoin(Haircut, Haircut.id == ReservationRollup.haircut_id) \
+            .filter(ReservationRollup.period == 'day', *in_range) \
+            .group_by(ReservationRollup.haircut_id, Haircut.name) \
+            .having(reservations != 0) \
+            .order_by(reservations.desc()) \
+            .all()
+
+        series = db.session.query(ReservationRollup.bucket, reservations, hairwash, revenue) \
+            .filter(ReservationRollup.period == period, *in_range) \
+            .group_by(ReservationRollup.bucket) \
+            .having(reservations != 0) \
+            .order_by(ReservationRollup.bucket) \
+            .all()
+
+        def summary(row):
+            total = int(row.reservations)
+            washes = int(row.hairwash)
+            return {
+                "reservations": total,
+                "hairwash": washes,
+                "hairwash_rate": round(washes / total, 4) if total else 0,
+                "revenue": float(row.revenue)
+            }
+
+        return response.ok({
+            **_range_payload(start, end, period),
+            "haircuts": [{
+                "haircut_id": row.haircut_id,
+                "haircut_name": row.name,
+                **summary(row)
+            } for row in haircuts],
+            "series": [{"bucket": row.bucket, **summary(row)} for row in series]
+        }, "Successfully retrieved reservation report")
+
+    except InvalidReportQuery as e:
+        return response.bad_request(str(e))
+    except Exception:
+        return response.internal_server_error("Internal server error")
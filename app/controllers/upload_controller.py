@@ -0,0 +1,47 @@
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required
+from flasgger import swag_from
+from app.modules.auth import current_user
+from app.modules import response
+from app.modules.upload_r2 import presign_upload, UploadError
+from app.modules.swagger_utils import get_doc_path
+
+upload_bp = Blueprint('upload', __name__, url_prefix='/uploads')
+
+UPLOAD_FOLDERS = {
+    "products": True,
+    "haircut-models": True,
+    "product-receipts": False,
+    "haircut-receipts": False,
+}
+
+
+@upload_bp.route('/presign', methods=['POST'], strict_slashes=False)
+@jwt_required()
+@swag_from(get_doc_path('upload/presign.yml'))
+def create_presigned_upload():
+    try:
+        data = request.get_json()
+        if not data:
+            return response.bad_request("Request body is empty")
+
+        folder = data.get("folder")
+        if folder not in UPLOAD_FOLDERS:
+            return response.bad_request("Invalid upload folder")
+
+        if UPLOAD_FOLDERS[folder]:
+            if not current_user or current_user.role != 'admin':
+                return response.unauthorized("Admin access required")
+
+        result = presign_upload(
+            data.get("filename"),
+            data.get("content_type", "application/octet-stream"),
+            folder
+        )
+
+        return response.created(result, "Upload URL created successfully")
+
+    except UploadError as e:
+        return response.bad_request(str(e))
+    except Exception:
+        return response.internal_server_error("Internal server error")
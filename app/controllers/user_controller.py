@@ -5,52 +5,58 @@ from flask_jwt_extended import (
     jwt_required,
     get_jwt_identity
 )
-from sqlalchemy.orm import load_only
 from flasgger import swag_from
 from app.models.user import User
 from app.modules import response
-from app.modules.transform import transform_data
+from app.modules.projection import Projection, InvalidFields
+from app.modules.pagination import paginate, Sorting, InvalidCursor, InvalidSort
 from app.modules.swagger_utils import get_doc_path
+from app.modules.auth import require_admin, invalidate_user
 from app import db
 
 user_bp = Blueprint("user", __name__, url_prefix="/user")
 
+USER_VIEW = Projection(
+    User,
+    ["id", "name", "email", "role"],
+    computed={
+        "created_at": lambda user: user.created_at.isoformat() if user.created_at else None,
+        "updated_at": lambda user: user.updated_at.isoformat() if user.updated_at else None
+    },
+    requires={"created_at": ("created_at",), "updated_at": ("updated_at",)}
+)
+
+USER_SORT = Sorting(User, ("created_at", "email"), default="-created_at")
+
 
 @user_bp.route("/", methods=["GET"], strict_slashes=False)
 @jwt_required()
+@require_admin("Unauthorized access")
 @swag_from(get_doc_path('user/get_list.yml'))
 def get_users():
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user or user.role != "admin":
-            return response.unauthorized("Unauthorized access")
         page = request.args.get("page", 1, type=int)
         limit = request.args.get("limit", 10, type=int)
+        cursor = request.args.get("cursor")
+
+        sort_column, descending = USER_SORT.parse(request.args.get("sort"))
+        view = USER_VIEW.only(request.args.get("fields"), keep=(sort_column.key,))
         
-        pagination = User.query \
-            .options(load_only(User.id, User.name, User.email, User.role, User.created_at, User.updated_at)) \
-            .paginate(page=page, per_page=limit, error_out=False)
+        query = User.query \
+            .options(*view.options())
+
+        items, pagination = paginate(query, page, limit, cursor,
+                                     order_by=(sort_column, User.id), descending=descending)
         
-        data = [{
-                "id": item.id,
-                "name": item.name,
-                "email": item.email,
-                "role": item.role,
-                "created_at": item.created_at.isoformat() if item.created_at else None,
-                "updated_at": item.updated_at.isoformat() if item.updated_at else None
-            } for item in pagination.items
-        ]
+        data = view.dump_many(items)
 
         return response.ok({
             "data": data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": pagination.total
-            }
+            "pagination": pagination
         }, "Successfully retrieved users")
 
+    except (InvalidCursor, InvalidSort, InvalidFields) as e:
+        return response.bad_request(str(e))
     except Exception:
         return response.internal_server_error("Internal server error")
 
@@ -118,7 +124,7 @@ def login():
         if not user or not check_password_hash(user.password, password):
             return response.unauthorized("Invalid email or password")
 
-        access_token = create_access_token(identity=str(user.id))
+        access_token = create_access_token(identity=str(user.id), additional_claims={"role": user.role})
 
         return response.ok(
             {"token": access_token},
@@ -222,6 +228,7 @@ def change_password():
 
         user.password = generate_password_hash(new_password)
         db.session.commit()
+        invalidate_user(uid)
 
         return response.ok(
             {},
@@ -1,28 +1,75 @@
-from flask import request
+import random
+from flask import request, session, current_app
 from flask_socketio import emit, join_room
+from flask_jwt_extended import decode_token
 from app.extensions import socketio
+from app.modules.auth import resolve_role
+
+
+def _log(event, **fields):
+    # Connect/disconnect fire on every page load; sample them so the log
+    # volume stays flat as the number of clients grows.
+    if random.random() >= current_app.config.get('SOCKETIO_LOG_SAMPLE_RATE', 0.01):
+        return
+    current_app.logger.info("event=%s %s", event, " ".join(f"{key}={value}" for key, value in fields.items()))
+
+
+def _token(auth):
+    if isinstance(auth, dict) and auth.get('token'):
+        return auth['token']
+
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):]
+
+    return request.args.get('token')
+
 
 @socketio.on('connect')
-def handle_connect():
-    print(f"[V] CLIENT CONNECTED: {request.sid}")
+def handle_connect(auth=None):
+    token = _token(auth)
+    if not token:
+        raise ConnectionRefusedError('unauthorized')
+
+    try:
+        claims = decode_token(token)
+    except Exception:
+        raise ConnectionRefusedError('unauthorized')
+
+    user_id = claims['sub']
+    role = resolve_role(user_id, claims)
+    if role is None:
+        raise ConnectionRefusedError('unauthorized')
+
+    session['user_id'] = user_id
+    session['role'] = role
+    _log('socket_connect', sid=request.sid, user_id=user_id, role=role)
+
 
 @socketio.on('disconnect')
-def handle_disconnect():
-    print(f"[X] CLIENT DISCONNECTED: {request.sid}")
+def handle_disconnect(*args):
+    _log('socket_disconnect', sid=request.sid, user_id=session.get('user_id'))
+
 
 @socketio.on('join_admin_room')
-def handle_join_admin_room(data):
-    room_name = data
-    if room_name:
-        join_room(room_name)
-        print(f"[->] Admin joined room: {room_name}")
-        emit('room_joined', {'message': f"Joined room {room_name}"}, to=room_name)
+def handle_join_admin_room(data=None):
+    if session.get('role') != 'admin':
+        emit('room_join_denied', {'message': "Admin access required"})
+        return
+
+    join_room('admin_room')
+    emit('room_joined', {'message': "Joined room admin_room"})
+
 
 @socketio.on('join_user_room')
-def handle_join_user_room(data):
-    user_id = data.get('user_id')
-    if user_id:
-        room_name = f"user_{user_id}"
-        join_room(room_name)
-        print(f"[->] User {user_id} joined room: {room_name}")
-        emit('room_joined', {'message': f"Joined room {room_name}"}, to=room_name)
\ No newline at end of file
+def handle_join_user_room(data=None):
+    user_id = session.get('user_id')
+    requested = data.get('user_id') if isinstance(data, dict) else None
+
+    if not user_id or (requested and requested != user_id):
+        emit('room_join_denied', {'message': "You can only join your own room"})
+        return
+
+    room_name = f"user_{user_id}"
+    join_room(room_name)
+    emit('room_joined', {'message': f"Joined room {room_name}"})
@@ -2,10 +2,16 @@ from flask_socketio import SocketIO
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flasgger import Swagger
+from app.modules.cache import Cache
+from app.modules.realtime import EmitBuffer
+from app.modules.metrics import Metrics
 
 db = SQLAlchemy()
 migrate = Migrate()
+cache = Cache()
+metrics = Metrics()
 socketio = SocketIO(cors_allowed_origins="*", async_mode='gevent')
+emitter = EmitBuffer(socketio, metrics)
 swagger_config = {
     "headers": [],
     "specs": [
@@ -1,22 +1,33 @@
 from app import db
 from uuid import uuid4
 from app.modules.time import get_wib_time
+from app.modules.serializer import columns_to_dict
+from app.modules.image_variants import variant_urls, IMAGE_READY
 
 class Haircut(db.Model):
     __tablename__ = 'haircuts'
+    __table_args__ = (
+        db.Index('ix_haircuts_deleted_at_choosen_count', 'deleted_at', 'choosen_count'),
+        db.Index('ix_haircuts_deleted_at_price', 'deleted_at', 'price'),
+        db.Index('ft_haircuts_name_description', 'name', 'description', mysql_prefix='FULLTEXT'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     name = db.Column(db.String(50), nullable=False)
     description = db.Column(db.String(500), nullable=True)
     image_url = db.Column(db.String(255), nullable=False)
     image_key = db.Column(db.String(255), nullable=False)
+    image_status = db.Column(db.String(10), nullable=False, default=IMAGE_READY, server_default=IMAGE_READY)
+    price = db.Column(db.Float, nullable=False, default=0, server_default='0')
     choosen_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=get_wib_time)
     updated_at = db.Column(db.DateTime, default=get_wib_time, onupdate=get_wib_time)
     deleted_at = db.Column(db.DateTime, nullable=True)
     
     def to_dict(self):
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        data = columns_to_dict(self)
+        data['variants'] = variant_urls(self.image_key, self.image_status)
+        return data
     
     def __repr__(self):
         return f'<Haircut {self.name}>'
\ No newline at end of file
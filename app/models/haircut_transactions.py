@@ -3,9 +3,15 @@ from app.models.user import User
 from app.models.haircut import Haircut
 from uuid import uuid4
 from app.modules.time import get_wib_time
+from app.modules.serializer import columns_to_dict
 
 class HaircutTransaction(db.Model):
     __tablename__ = 'haircut_transactions'
+    __table_args__ = (
+        db.Index('ix_haircut_transactions_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_haircut_transactions_created_at', 'created_at'),
+        db.Index('ix_haircut_transactions_reservation_time', 'reservation_time'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey(User.id), nullable=False)
@@ -20,12 +26,32 @@ class HaircutTransaction(db.Model):
     receipt_key = db.Column(db.String(500), nullable=True)
     created_at = db.Column(db.DateTime, default=get_wib_time)
     updated_at = db.Column(db.DateTime, default=get_wib_time, onupdate=get_wib_time)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
 
     user = db.relationship(User, backref=db.backref('haircut_transactions', lazy=True))
     haircut = db.relationship(Haircut, backref=db.backref('haircut_transactions', lazy=True))
+    slot = db.relationship('ReservationSlot', uselist=False, lazy=True, cascade="all, delete-orphan")
     
     def to_dict(self):
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        return columns_to_dict(self)
+
+    def __repr__(self):
+        return f'<HaircutTransaction {self.id} - Hairwash: {self.hairwash} - Total Price: {self.total_price}>'
+
+
+class ReservationSlot(db.Model):
+    """One row per occupied chair per slot; the primary key is what stops
+    two bookings from taking the same chair."""
+    __tablename__ = 'reservation_slots'
+
+    slot_start = db.Column(db.DateTime, primary_key=True)
+    chair = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.String(36), db.ForeignKey(HaircutTransaction.id), nullable=False, unique=True)
+
+    def to_dict(self):
+        return columns_to_dict(self)
 
     def __repr__(self):
-        return f'<HaircutTransaction {self.id} - Hairwash: {self.hairwash} - Total Price: {self.total_price}>'
\ No newline at end of file
+        return f'<ReservationSlot {self.slot_start} Chair:{self.chair}>'
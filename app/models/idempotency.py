@@ -0,0 +1,27 @@
+from app import db
+from app.modules.time import get_wib_time
+from app.modules.serializer import columns_to_dict
+
+
+class IdempotencyKey(db.Model):
+    """One row per ``Idempotency-Key`` seen on a protected endpoint.
+
+    ``key`` is a SHA-256 of endpoint, user and the client's key, so the table
+    stays fixed-width whatever clients send. ``status_code`` is NULL while the
+    first request is still running; afterwards the row holds its response
+    until ``expires_at``.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    key = db.Column(db.String(64), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.SmallInteger, nullable=True)
+    response = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=get_wib_time)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self):
+        return columns_to_dict(self)
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} {self.status_code}>'
@@ -1,9 +1,16 @@
 from app import db
 from uuid import uuid4
 from app.modules.time import get_wib_time
+from app.modules.serializer import columns_to_dict
+from app.modules.image_variants import variant_urls, IMAGE_READY
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_deleted_at_created_at', 'deleted_at', 'created_at'),
+        db.Index('ix_products_deleted_at_price', 'deleted_at', 'price'),
+        db.Index('ft_products_name_description', 'name', 'description', mysql_prefix='FULLTEXT'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     name = db.Column(db.String(50), nullable=False)
@@ -11,13 +18,16 @@ class Product(db.Model):
     price = db.Column(db.Float, nullable=False)
     image_url = db.Column(db.String(255), nullable=True)
     image_key = db.Column(db.String(255), nullable=True)
+    image_status = db.Column(db.String(10), nullable=False, default=IMAGE_READY, server_default=IMAGE_READY)
     stock = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=get_wib_time)
     updated_at = db.Column(db.DateTime, default=get_wib_time, onupdate=get_wib_time)
     deleted_at = db.Column(db.DateTime, nullable=True)
     
     def to_dict(self):
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        data = columns_to_dict(self)
+        data['variants'] = variant_urls(self.image_key, self.image_status)
+        return data
     
     def __repr__(self):
         return f'<Product {self.name}>'
\ No newline at end of file
@@ -3,9 +3,14 @@ from app.models.user import User
 from app.models.product import Product
 from uuid import uuid4
 from app.modules.time import get_wib_time
+from app.modules.serializer import columns_to_dict
 
 class ProductTransaction(db.Model):
     __tablename__ = 'product_transactions'
+    __table_args__ = (
+        db.Index('ix_product_transactions_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_product_transactions_created_at', 'created_at'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey(User.id), nullable=False)
@@ -20,12 +25,15 @@ class ProductTransaction(db.Model):
     receipt_key = db.Column(db.String(500), nullable=True)
     created_at = db.Column(db.DateTime, default=get_wib_time)
     updated_at = db.Column(db.DateTime, default=get_wib_time, onupdate=get_wib_time)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
 
     user = db.relationship(User, backref=db.backref('product_transactions', lazy=True))
-    items = db.relationship('TransactionItem', backref='transaction', lazy=True, cascade="all, delete-orphan")
+    items = db.relationship('TransactionItem', backref='transaction', lazy='selectin', cascade="all, delete-orphan")
 
     def to_dict(self):
-        base_dict = {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        base_dict = columns_to_dict(self)
         base_dict['items'] = [item.to_dict() for item in self.items]
         return base_dict
 
@@ -41,14 +49,15 @@ class TransactionItem(db.Model):
     product_id = db.Column(db.String(36), db.ForeignKey(Product.id), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price_at_purchase = db.Column(db.Float, nullable=False) 
-    product = db.relationship('Product')
+    product = db.relationship('Product', lazy='joined')
 
     def to_dict(self):
+        product = self.product
         return {
             'id': self.id,
             'product_id': self.product_id,
-            'product_name': self.product.name if self.product else "Unknown Product",
-            'product_image': self.product.image_url if self.product else None,
+            'product_name': product.name if product else "Unknown Product",
+            'product_image': product.image_url if product else None,
             'quantity': self.quantity,
             'price_at_purchase': self.price_at_purchase,
             'subtotal': self.quantity * self.price_at_purchase
@@ -60,6 +69,9 @@ class TransactionItem(db.Model):
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        db.Index('ix_cart_items_user_id_product_id', 'user_id', 'product_id'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey(User.id), nullable=False)
@@ -69,17 +81,18 @@ class CartItem(db.Model):
     updated_at = db.Column(db.DateTime, default=get_wib_time, onupdate=get_wib_time)
 
     user = db.relationship(User, backref=db.backref('cart_items', lazy=True, cascade="all, delete-orphan"))
-    product = db.relationship(Product, backref=db.backref('cart_items', lazy=True))
+    product = db.relationship(Product, lazy='joined', backref=db.backref('cart_items', lazy=True))
 
     def to_dict(self):
+        product = self.product
         return {
             'id': self.id,
             'user_id': self.user_id,
             'product_id': self.product_id,
             'quantity': self.quantity,
-            'product_name': self.product.name if self.product else None,
-            'product_price': self.product.price if self.product else 0,
-            'total_price': (self.product.price * self.quantity) if self.product else 0
+            'product_name': product.name if product else None,
+            'product_price': product.price if product else 0,
+            'total_price': (product.price * self.quantity) if product else 0
         }
 
     def __repr__(self):
@@ -0,0 +1,52 @@
+from app import db
+from app.modules.serializer import columns_to_dict
+
+
+class SalesRollup(db.Model):
+    __tablename__ = 'report_sales'
+
+    period = db.Column(db.String(4), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    source = db.Column(db.String(10), primary_key=True)
+    payment_status = db.Column(db.String(50), primary_key=True)
+    transactions = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return columns_to_dict(self)
+
+    def __repr__(self):
+        return f'<SalesRollup {self.period} {self.bucket} {self.source}:{self.payment_status}>'
+
+
+class ProductSalesRollup(db.Model):
+    __tablename__ = 'report_product_sales'
+
+    period = db.Column(db.String(4), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    product_id = db.Column(db.String(36), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return columns_to_dict(self)
+
+    def __repr__(self):
+        return f'<ProductSalesRollup {self.period} {self.bucket} {self.product_id}>'
+
+
+class ReservationRollup(db.Model):
+    __tablename__ = 'report_reservations'
+
+    period = db.Column(db.String(4), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    haircut_id = db.Column(db.String(36), primary_key=True)
+    reservations = db.Column(db.Integer, nullable=False, default=0)
+    hairwash = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return columns_to_dict(self)
+
+    def __repr__(self):
+        return f'<ReservationRollup {self.period} {self.bucket} {self.haircut_id}>'
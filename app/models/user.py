@@ -2,9 +2,13 @@ from app import db
 from datetime import datetime, timedelta
 from uuid import uuid4
 from app.modules.time import get_wib_time
+from app.modules.serializer import columns_to_dict
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at', 'created_at'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
     name = db.Column(db.String(50), nullable=False)
@@ -15,7 +19,7 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=get_wib_time, onupdate=get_wib_time)
     
     def to_dict(self):
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        return columns_to_dict(self)
     
     def __repr__(self):
         return f'<User {self.name}>' 
\ No newline at end of file
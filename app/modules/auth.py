@@ -0,0 +1,102 @@
+import time
+from collections import namedtuple
+from functools import wraps
+from flask import g, current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from werkzeug.local import LocalProxy
+from app.extensions import cache
+from app.models.user import User
+from app.modules import response
+from app.modules.cache import MemoryCache, RedisCache
+
+AuthUser = namedtuple('AuthUser', ['id', 'role'])
+
+ROLE_TTL = 60
+
+_roles = MemoryCache(max_entries=4096)
+
+
+def _markers():
+    # Stale markers must be visible to every worker, which only the shared
+    # Redis cache gives; a per-process marker would reach one worker only.
+    return cache.backend if isinstance(cache.backend, RedisCache) else None
+
+
+def _stale_since(markers, user_id):
+    value = markers.get(f"auth:stale:{user_id}")
+    return float(value) if value else 0.0
+
+
+def _lookup_role(user_id, stale_since):
+    entry = _roles.get(user_id)
+    if entry and entry[1] >= stale_since:
+        return entry[0]
+
+    user = User.query.get(user_id)
+    role = user.role if user else None
+    _roles.set(user_id, (role, time.time()), ROLE_TTL)
+    return role
+
+
+def resolve_role(user_id, claims):
+    """Role from the token claims, unless the user's role or password changed
+    after the token was issued; then a TTL-cached lookup decides.
+
+    That needs ``CACHE_BACKEND=redis`` for the markers. With the default
+    memory backend the claims are never trusted and every role comes from
+    the per-worker lookup cache, so a change made on one worker reaches the
+    others within ``ROLE_TTL`` seconds.
+    """
+    markers = _markers()
+    if markers is None:
+        return _lookup_role(user_id, 0.0)
+
+    stale_since = _stale_since(markers, user_id)
+
+    role = claims.get('role')
+    if role is not None and claims.get('iat', 0) >= stale_since:
+        return role
+
+    return _lookup_role(user_id, stale_since)
+
+
+def invalidate_user(user_id):
+    """Call after changing a user's role or password. Immediate on every
+    worker with Redis; otherwise immediate on this worker only, see
+    ``resolve_role``."""
+    _roles.delete(user_id)
+    markers = _markers()
+    if markers is not None:
+        markers.set(
+            f"auth:stale:{user_id}",
+            str(time.time()),
+            current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 3600)
+        )
+
+
+def get_current_user():
+    if '_auth_user' not in g:
+        user_id = get_jwt_identity()
+        role = resolve_role(user_id, get_jwt()) if user_id else None
+        g._auth_user = AuthUser(user_id, role) if role else None
+    return g._auth_user
+
+
+current_user = LocalProxy(get_current_user)
+
+
+def require_admin(message="Admin access required"):
+    """Use below ``@jwt_required()``."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                user = get_current_user()
+            except Exception:
+                return response.internal_server_error("Internal server error")
+
+            if not user or user.role != 'admin':
+                return response.unauthorized(message)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
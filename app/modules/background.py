@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import db
+
+_executor = None
+
+
+def _get_executor(app):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=app.config.get('BACKGROUND_WORKERS', 4),
+            thread_name_prefix='background'
+        )
+    return _executor
+
+
+def submit(fn, *args, **kwargs):
+    """Run ``fn`` off-request inside its own app context.
+
+    With ``BACKGROUND_TASKS`` disabled the call runs inline, which keeps tests
+    and one-off scripts deterministic.
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.exception("Background task error: %s", e)
+            finally:
+                db.session.remove()
+
+    if not app.config.get('BACKGROUND_TASKS', True):
+        return run()
+
+    return _get_executor(app).submit(run)
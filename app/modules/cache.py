@@ -0,0 +1,139 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+
+
+class MemoryCache:
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisCache:
+    """Shared backend for any server speaking the Redis protocol."""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def counter(self, key):
+        value = self.client.get(key)
+        return int(value) if value else 0
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+class Cache:
+    """Read-through response cache for public GET endpoints.
+
+    Each namespace has a generation counter for its list keys, so a write
+    invalidates every cached page with one increment, while detail keys are
+    deleted by id.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 60
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+
+        if app.config.get('CACHE_BACKEND') == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'])
+        else:
+            self.backend = MemoryCache(app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+    def _key(self, namespace, view_arg, view_args, query_args):
+        if view_arg:
+            return f"{namespace}:detail:{view_args[view_arg]}"
+
+        params = "&".join(f"{name}={request.args.get(name)}" for name in query_args)
+        return f"{namespace}:list:{self.backend.counter(f'{namespace}:gen')}:{params}"
+
+    def invalidate(self, namespace, *ids):
+        self.backend.incr(f"{namespace}:gen")
+        self.backend.delete(*(f"{namespace}:detail:{item_id}" for item_id in ids))
+
+    def _respond(self, body, etag):
+        resp = current_app.response_class(body, status=200, mimetype='application/json')
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = f"public, max-age={self.ttl}"
+        return resp.make_conditional(request)
+
+    def cached(self, namespace, view_arg=None, query_args=('page', 'limit', 'cursor')):
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = self._key(namespace, view_arg, kwargs, query_args)
+
+                hit = self.backend.get(key)
+                if hit is not None:
+                    etag, body = hit.split(b"\n", 1)
+                    return self._respond(body, etag.decode())
+
+                resp = fn(*args, **kwargs)
+                if resp.status_code != 200:
+                    return resp
+
+                body = resp.get_data()
+                etag = hashlib.md5(body).hexdigest()
+                self.backend.set(key, etag.encode() + b"\n" + body, self.ttl)
+
+                return self._respond(body, etag)
+            return wrapper
+        return decorator
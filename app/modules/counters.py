@@ -0,0 +1,123 @@
+import atexit
+import threading
+from flask import current_app
+from sqlalchemy import case, func, update
+from app import db
+from app.extensions import cache
+from app.models.haircut import Haircut
+from app.models.haircut_transactions import HaircutTransaction
+
+INACTIVE_STATUSES = ('cancelled',)
+
+
+def is_active(reservation_status):
+    return reservation_status not in INACTIVE_STATUSES
+
+
+class ChoosenCounter:
+    """Keep ``Haircut.choosen_count`` equal to the number of non-cancelled
+    reservations per haircut.
+
+    Call ``add`` after the reservation change is committed. Deltas are
+    coalesced per haircut and written every ``CHOOSEN_COUNT_FLUSH_INTERVAL``
+    seconds as one relative ``UPDATE`` (``choosen_count = choosen_count +
+    CASE id ...``), so a burst of bookings on one popular cut costs one row
+    write instead of one per booking. Deltas still pending when a worker dies
+    are lost; ``flask reconcile-choosen-count`` repairs the drift.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.buffered = True
+        self.interval = 2.0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def init_app(self, app):
+        self.app = app
+        self.buffered = app.config.get('CHOOSEN_COUNT_BUFFERED', True)
+        self.interval = app.config.get('CHOOSEN_COUNT_FLUSH_INTERVAL', self.interval)
+        atexit.register(self.flush)
+
+    def add(self, haircut_id, delta):
+        if not delta:
+            return
+
+        if not self.buffered:
+            self._write({haircut_id: delta})
+            return
+
+        with self._lock:
+            self._pending[haircut_id] = self._pending.get(haircut_id, 0) + delta
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+
+        if not pending or self.app is None:
+            return
+
+        with self.app.app_context():
+            try:
+                self._write(pending)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("choosen_count flush failed, lost increments: %s", pending)
+            finally:
+                db.session.remove()
+
+    def _write(self, deltas):
+        deltas = {haircut_id: delta for haircut_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        db.session.execute(
+            update(Haircut)
+            .where(Haircut.id.in_(deltas))
+            .values(
+                choosen_count=func.coalesce(Haircut.choosen_count, 0) + case(deltas, value=Haircut.id, else_=0),
+                updated_at=Haircut.updated_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        cache.invalidate('haircuts', *deltas)
+
+    def reconcile(self):
+        """Recompute every count from ``haircut_transactions``; returns the
+        ids whose stored value had drifted."""
+        self.flush()
+
+        actual = func.coalesce(func.sum(case(
+            (HaircutTransaction.reservation_status.notin_(INACTIVE_STATUSES), 1), else_=0
+        )), 0)
+        rows = db.session.query(Haircut.id, Haircut.choosen_count, actual) \
+            .outerjoin(HaircutTransaction, HaircutTransaction.haircut_id == Haircut.id) \
+            .group_by(Haircut.id, Haircut.choosen_count) \
+            .all()
+
+        drifted = {haircut_id: count for haircut_id, stored, count in rows if stored != count}
+        if drifted:
+            db.session.execute(
+                update(Haircut)
+                .where(Haircut.id.in_(drifted))
+                .values(
+                    choosen_count=case(drifted, value=Haircut.id, else_=Haircut.choosen_count),
+                    updated_at=Haircut.updated_at
+                )
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+
+        if drifted:
+            cache.invalidate('haircuts', *drifted)
+        return drifted
+
+
+choosen_counter = ChoosenCounter()
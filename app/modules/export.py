@@ -0,0 +1,215 @@
+import csv
+import io
+from datetime import date, datetime, timedelta
+from flask import current_app, stream_with_context
+from sqlalchemy import select
+from app import db
+from app.models.user import User
+from app.models.product import Product
+from app.models.haircut import Haircut
+from app.models.product_transactions import ProductTransaction, TransactionItem
+from app.models.haircut_transactions import HaircutTransaction
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+BATCH_SIZE = 1000
+
+# Spreadsheets run cells starting with these as formulas.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class InvalidExport(ValueError):
+    pass
+
+
+def parse_filters(args, status_fields):
+    """Read ``format``, the inclusive ``start``/``end`` dates and one
+    comma-separated filter per name in ``status_fields``."""
+    fmt = args.get("format", "csv").lower()
+    if fmt not in FORMATS:
+        raise InvalidExport("format must be one of: " + ", ".join(FORMATS))
+
+    try:
+        start = args.get("start")
+        start = datetime.strptime(start, "%Y-%m-%d") if start else None
+        end = args.get("end")
+        end = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1) if end else None
+    except ValueError:
+        raise InvalidExport("Invalid date, use YYYY-MM-DD")
+
+    if start and end and start >= end:
+        raise InvalidExport("start must not be after end")
+
+    statuses = {}
+    for field in status_fields:
+        values = [value.strip() for value in args.get(field, "").split(",") if value.strip()]
+        if values:
+            statuses[field] = values
+
+    return {"format": fmt, "start": start, "end": end, "statuses": statuses}
+
+
+def _filtered(statement, model, filters):
+    if filters["start"]:
+        statement = statement.where(model.created_at >= filters["start"])
+    if filters["end"]:
+        statement = statement.where(model.created_at < filters["end"])
+    for field, values in filters["statuses"].items():
+        statement = statement.where(getattr(model, field).in_(values))
+    return statement
+
+
+def _cell(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value):
+    """``_cell`` with user text that a spreadsheet would evaluate (names,
+    addresses) prefixed by ``'`` so it opens as plain text."""
+    value = _cell(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _filename(name, filters):
+    start = filters["start"].strftime("%Y-%m-%d") if filters["start"] else "all"
+    end = (filters["end"] - timedelta(days=1)).strftime("%Y-%m-%d") if filters["end"] else "all"
+    return f"{name}_{start}_{end}.{filters['format']}"
+
+
+def _csv_chunks(result, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    for rows in result.partitions():
+        writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(result, columns, nested=None):
+    """One JSON object per line. With ``nested = (key, child_columns)`` the
+    rows of one parent (consecutive, thanks to the ORDER BY) are folded into
+    a list under ``key``; a parent without children gets an empty list."""
+    dumps = current_app.json.dumps
+    parent_columns = [name for name in columns if not nested or name not in nested[1]]
+    current = None
+
+    for rows in result.partitions():
+        lines = []
+        for row in rows:
+            values = dict(zip(columns, map(_cell, row)))
+            if not nested:
+                lines.append(dumps(values))
+                continue
+
+            key, child_columns = nested
+            if current is None or current["id"] != values["id"]:
+                if current is not None:
+                    lines.append(dumps(current))
+                current = {name: values[name] for name in parent_columns}
+                current[key] = []
+            if values[child_columns[0]] is not None:
+                current[key].append({name: values[name] for name in child_columns})
+
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    if current is not None:
+        yield dumps(current) + "\n"
+
+
+def _stream(statement, filters, nested=None):
+    """Execute ``statement`` with a server-side cursor and return a generator
+    response. Rows are fetched ``BATCH_SIZE`` at a time and written out as
+    they arrive, so memory stays flat however many rows match."""
+    result = db.session.execute(statement.execution_options(yield_per=BATCH_SIZE))
+    columns = list(result.keys())
+
+    def generate():
+        try:
+            if filters["format"] == "csv":
+                yield from _csv_chunks(result, columns)
+            else:
+                yield from _ndjson_chunks(result, columns, nested)
+        finally:
+            result.close()
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype=FORMATS[filters["format"]],
+        headers={"X-Accel-Buffering": "no"}
+    )
+
+
+ITEM_COLUMNS = ('item_id', 'product_id', 'product_name', 'quantity', 'price_at_purchase')
+
+
+def product_transactions(filters):
+    """One CSV row per transaction item (transactions without items keep one
+    row with empty item columns); NDJSON nests the items per transaction."""
+    statement = select(
+        ProductTransaction.id,
+        ProductTransaction.created_at,
+        ProductTransaction.user_id,
+        User.name.label('user_name'),
+        User.email.label('user_email'),
+        ProductTransaction.total_price,
+        ProductTransaction.expedition_cost,
+        ProductTransaction.expedition_service,
+        ProductTransaction.expedition_status,
+        ProductTransaction.shipping_address,
+        ProductTransaction.payment_method,
+        ProductTransaction.payment_status,
+        TransactionItem.id.label('item_id'),
+        TransactionItem.product_id,
+        Product.name.label('product_name'),
+        TransactionItem.quantity,
+        TransactionItem.price_at_purchase
+    ) \
+        .select_from(ProductTransaction) \
+        .join(User, User.id == ProductTransaction.user_id) \
+        .outerjoin(TransactionItem, TransactionItem.transaction_id == ProductTransaction.id) \
+        .outerjoin(Product, Product.id == TransactionItem.product_id) \
+        .order_by(ProductTransaction.created_at, ProductTransaction.id, TransactionItem.id)
+
+    resp = _stream(_filtered(statement, ProductTransaction, filters), filters, nested=('items', ITEM_COLUMNS))
+    resp.headers["Content-Disposition"] = f'attachment; filename="{_filename("product_transactions", filters)}"'
+    return resp
+
+
+def haircut_transactions(filters):
+    statement = select(
+        HaircutTransaction.id,
+        HaircutTransaction.created_at,
+        HaircutTransaction.user_id,
+        User.name.label('user_name'),
+        User.email.label('user_email'),
+        HaircutTransaction.haircut_id,
+        Haircut.name.label('haircut_name'),
+        HaircutTransaction.hairwash,
+        HaircutTransaction.total_price,
+        HaircutTransaction.reservation_time,
+        HaircutTransaction.reservation_status,
+        HaircutTransaction.payment_method,
+        HaircutTransaction.payment_status
+    ) \
+        .select_from(HaircutTransaction) \
+        .join(User, User.id == HaircutTransaction.user_id) \
+        .join(Haircut, Haircut.id == HaircutTransaction.haircut_id) \
+        .order_by(HaircutTransaction.created_at, HaircutTransaction.id)
+
+    resp = _stream(_filtered(statement, HaircutTransaction, filters), filters)
+    resp.headers["Content-Disposition"] = f'attachment; filename="{_filename("haircut_transactions", filters)}"'
+    return resp
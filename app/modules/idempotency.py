@@ -0,0 +1,199 @@
+import hashlib
+import time
+from collections import namedtuple
+from datetime import timedelta
+from functools import wraps
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.idempotency import IdempotencyKey
+from app.modules import response
+from app.modules.cache import MemoryCache
+from app.modules.time import get_wib_time
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+Stored = namedtuple('Stored', ['request_hash', 'status_code', 'body'])
+
+
+class Idempotency:
+    """``Idempotency-Key`` support for endpoints that create orders.
+
+    The first request with a key claims it by inserting a row with an empty
+    response; the primary key turns a concurrent duplicate into an
+    IntegrityError, and that duplicate waits up to ``IDEMPOTENCY_WAIT``
+    seconds for the first one to finish before giving up with 409. A 2xx
+    response is stored on the row and replayed for ``IDEMPOTENCY_TTL``
+    seconds without calling the view again; any other outcome drops the claim
+    so the client may retry. Completed keys are also kept in a per-process
+    LRU, so a replay usually costs no query at all.
+
+    The response is stored in its own commit after the view's, so a worker
+    dying in between leaves a claim without a response. Such a claim is taken
+    over once it is older than ``IDEMPOTENCY_LOCK_TIMEOUT`` seconds.
+    """
+
+    def __init__(self):
+        self.ttl = 86400
+        self.wait = 10.0
+        self.lock_timeout = 60
+        self.purge_interval = 300
+        self.hot = MemoryCache()
+        self._next_purge = 0.0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('IDEMPOTENCY_TTL', self.ttl)
+        self.wait = app.config.get('IDEMPOTENCY_WAIT', self.wait)
+        self.lock_timeout = app.config.get('IDEMPOTENCY_LOCK_TIMEOUT', self.lock_timeout)
+        self.purge_interval = app.config.get('IDEMPOTENCY_PURGE_INTERVAL', self.purge_interval)
+        self.hot = MemoryCache(app.config.get('IDEMPOTENCY_CACHE_SIZE', 1024))
+
+    def _claim(self, key, request_hash):
+        """Return ``None`` once this request owns ``key``, otherwise what is
+        stored for it (``status_code`` is ``None`` while still running)."""
+        now = get_wib_time()
+        try:
+            db.session.execute(insert(IdempotencyKey).values(
+                key=key,
+                request_hash=request_hash,
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl)
+            ))
+            db.session.commit()
+            return None
+        except IntegrityError:
+            db.session.rollback()
+
+        record = db.session.get(IdempotencyKey, key, populate_existing=True)
+        if record is None:
+            return Stored(request_hash, None, None)
+
+        expired = record.expires_at <= now
+        abandoned = record.status_code is None and record.created_at <= now - timedelta(seconds=self.lock_timeout)
+        if expired or abandoned:
+            # Conditional on created_at so only one waiter takes it over.
+            result = db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key, IdempotencyKey.created_at == record.created_at)
+                .values(request_hash=request_hash, status_code=None, response=None,
+                        created_at=now, expires_at=now + timedelta(seconds=self.ttl))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return None if result.rowcount == 1 else Stored(request_hash, None, None)
+
+        stored = Stored(record.request_hash, record.status_code, record.response)
+        db.session.commit()
+        if stored.status_code is not None:
+            self.hot.set(key, stored, (record.expires_at - now).total_seconds())
+        return stored
+
+    def _complete(self, key, stored):
+        try:
+            db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(status_code=stored.status_code, response=stored.body,
+                        expires_at=get_wib_time() + timedelta(seconds=self.ttl))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            self.hot.set(key, stored, self.ttl)
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Idempotency store failed, a retry will run the request again")
+
+    def _release(self, key):
+        try:
+            db.session.execute(
+                delete(IdempotencyKey)
+                .where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Idempotency release failed, the key stays claimed until IDEMPOTENCY_LOCK_TIMEOUT")
+
+    def _replay(self, stored, request_hash):
+        if stored.request_hash != request_hash:
+            return response.unprocessable_entity(f"{HEADER} was already used with a different request body")
+
+        resp = current_app.response_class(stored.body, status=stored.status_code, mimetype='application/json')
+        resp.headers['Idempotent-Replayed'] = 'true'
+        return resp
+
+    def purge_expired(self):
+        """Delete every expired key; returns how many were removed."""
+        result = db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at < get_wib_time())
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def _maybe_purge(self):
+        if time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + self.purge_interval
+        try:
+            self.purge_expired()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Idempotency purge failed")
+
+    def idempotent(self, scope):
+        """Honour ``Idempotency-Key`` on a ``jwt_required`` view; ``scope``
+        keeps keys of different endpoints apart."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                raw_key = request.headers.get(HEADER)
+                if raw_key is None:
+                    return fn(*args, **kwargs)
+
+                raw_key = raw_key.strip()
+                if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+                    return response.bad_request(f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+
+                key = hashlib.sha256(f"{scope}\n{get_jwt_identity()}\n{raw_key}".encode()).hexdigest()
+                request_hash = hashlib.sha256(request.get_data()).hexdigest()
+
+                stored = self.hot.get(key)
+                if stored is not None:
+                    return self._replay(stored, request_hash)
+
+                self._maybe_purge()
+                deadline = time.monotonic() + self.wait
+                while True:
+                    stored = self._claim(key, request_hash)
+                    if stored is None:
+                        break
+                    if stored.status_code is not None or stored.request_hash != request_hash:
+                        return self._replay(stored, request_hash)
+                    if time.monotonic() >= deadline:
+                        return response.conflict(f"A request with this {HEADER} is still being processed, retry later")
+
+                    time.sleep(POLL_INTERVAL)
+                    stored = self.hot.get(key)
+                    if stored is not None:
+                        return self._replay(stored, request_hash)
+
+                try:
+                    resp = fn(*args, **kwargs)
+                except Exception:
+                    self._release(key)
+                    raise
+
+                if 200 <= resp.status_code < 300:
+                    self._complete(key, Stored(request_hash, resp.status_code, resp.get_data(as_text=True)))
+                else:
+                    self._release(key)
+                return resp
+            return wrapper
+        return decorator
+
+
+idempotency = Idempotency()
@@ -0,0 +1,70 @@
+import io
+from PIL import Image, ImageOps
+from r2_config import s3, R2_BUCKET, R2_PUBLIC
+
+# Longest edge in pixels, largest first so each size is resized from the
+# previous one instead of from the original.
+VARIANTS = {"full": 1280, "card": 480, "thumb": 160}
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def variant_key(key: str, variant: str, ext: str):
+    return f"{key.rsplit('.', 1)[0]}.{variant}.{ext}"
+
+
+def variant_keys(key: str):
+    return [variant_key(key, variant, ext) for variant in VARIANTS for ext in FORMATS]
+
+
+# ``image_status`` of products and haircuts: variants are only advertised
+# once the image and all of its variants are stored.
+IMAGE_PENDING = 'pending'
+IMAGE_READY = 'ready'
+IMAGE_FAILED = 'failed'
+
+
+def variant_urls(key, status=IMAGE_READY):
+    if not key or status != IMAGE_READY:
+        return None
+
+    return {
+        variant: {ext: f"{R2_PUBLIC}/{variant_key(key, variant, ext)}" for ext in FORMATS}
+        for variant in VARIANTS
+    }
+
+
+def render_variants(body: bytes):
+    """Decode once and yield ``(variant, ext, data, content_type)``.
+
+    Orientation is applied from EXIF before resizing; the encoded variants
+    carry no EXIF, so GPS and camera metadata never reach the CDN.
+    """
+    image = Image.open(io.BytesIO(body))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    for variant, size in VARIANTS.items():
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+
+        for ext, (fmt, content_type, options) in FORMATS.items():
+            out = io.BytesIO()
+            image.save(out, fmt, **options)
+            yield variant, ext, out.getvalue(), content_type
+
+
+def generate_variants(key: str, body: bytes = None):
+    if body is None:
+        body = s3.get_object(Bucket=R2_BUCKET, Key=key)["Body"].read()
+
+    for variant, ext, data, content_type in render_variants(body):
+        s3.put_object(
+            Bucket=R2_BUCKET,
+            Key=variant_key(key, variant, ext),
+            Body=data,
+            ContentType=content_type
+        )
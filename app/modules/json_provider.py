@@ -0,0 +1,61 @@
+import decimal
+import uuid
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _default(o):
+    if type(o) is datetime and o.tzinfo is None:
+        # Same string as werkzeug's http_date for the naive datetimes the
+        # models store, without going through email.utils.
+        return (
+            f"{_DAYS[o.weekday()]}, {o.day:02d} {_MONTHS[o.month - 1]} {o.year:04d} "
+            f"{o.hour:02d}:{o.minute:02d}:{o.second:02d} GMT"
+        )
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """orjson-backed provider with the same output as Flask's default one.
+
+    Keys stay sorted and datetimes keep the RFC 822 form clients already
+    parse (``JSON_DATETIME_FORMAT = 'iso'`` switches to orjson's native
+    ISO 8601 encoding, which skips the Python callback entirely).
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        if app.config.get('JSON_DATETIME_FORMAT', 'http') != 'iso':
+            self.option |= orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self.option),
+            mimetype="application/json"
+        )
+
+
+def init_json_provider(app):
+    app.json = OrjsonProvider(app) if orjson else DefaultJSONProvider(app)
@@ -0,0 +1,206 @@
+import bisect
+import hmac
+import logging
+import threading
+import time
+from flask import g, request, Response
+from flask_sqlalchemy.record_queries import get_recorded_queries
+from app.modules import response
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, values, amount=1):
+        self._series[values] = self._series.get(values, 0) + amount
+
+    def render(self):
+        for values, total in sorted(self._series.items()):
+            yield f"{self.name}{_labels(self.labels, values)} {total}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels, buckets):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, values, value):
+        series = self._series.get(values)
+        if series is None:
+            # One slot per bucket plus +Inf, then sum.
+            series = self._series[values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        for values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets + ('+Inf',), series):
+                cumulative += hits
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {cumulative}"
+
+
+class Metrics:
+    """Per-process request, database, R2 and Socket.IO metrics.
+
+    Request hooks read the statements Flask-SQLAlchemy already records
+    (``SQLALCHEMY_RECORD_QUERIES``), R2 calls are timed through botocore's
+    event hooks, and everything is served as Prometheus text at ``/metrics``
+    to scrapers sending ``METRICS_TOKEN`` as a bearer token. Each worker
+    keeps its own numbers, so scrape every worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.slow_query_threshold = 0.5
+        self.token = None
+
+        self.requests = Counter(
+            'http_requests_total', 'Requests by endpoint and status.',
+            ('method', 'endpoint', 'status'))
+        self.request_latency = Histogram(
+            'http_request_duration_seconds', 'Request latency.',
+            ('method', 'endpoint'), LATENCY_BUCKETS)
+        self.db_statements = Histogram(
+            'http_request_db_statements', 'SQL statements per request.',
+            ('endpoint',), COUNT_BUCKETS)
+        self.db_time = Histogram(
+            'http_request_db_seconds', 'Time spent in SQL per request.',
+            ('endpoint',), LATENCY_BUCKETS)
+        self.slow_queries = Counter(
+            'db_slow_queries_total', 'Statements slower than SLOW_QUERY_THRESHOLD.',
+            ('endpoint',))
+        self.r2_latency = Histogram(
+            'r2_request_duration_seconds', 'R2 API call latency.',
+            ('operation',), LATENCY_BUCKETS)
+        self.socket_emits = Counter(
+            'socketio_emits_total', 'Socket.IO events published.',
+            ('event',))
+        self.socket_emit_errors = Counter(
+            'socketio_emit_errors_total', 'Socket.IO events that failed to publish.',
+            ('event',))
+        self.socket_emits_dropped = Counter(
+            'socketio_emits_dropped_total', 'Socket.IO events dropped because the emit queue was full.',
+            ('event',))
+
+        self._metrics = (
+            self.requests, self.request_latency, self.db_statements, self.db_time,
+            self.slow_queries, self.r2_latency, self.socket_emits, self.socket_emit_errors,
+            self.socket_emits_dropped
+        )
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+
+        self.slow_query_threshold = app.config.get('SLOW_QUERY_THRESHOLD', self.slow_query_threshold)
+        self.token = app.config.get('METRICS_TOKEN')
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+        self._instrument_r2()
+
+    def _instrument_r2(self):
+        from r2_config import s3
+
+        events = s3.meta.events
+        events.register('before-call.s3', self._r2_before, unique_id='metrics-r2-before')
+        events.register('after-call.s3', self._r2_after, unique_id='metrics-r2-after')
+
+    def _r2_before(self, context, **kwargs):
+        context['metrics_start'] = time.perf_counter()
+
+    def _r2_after(self, context, model, **kwargs):
+        start = context.get('metrics_start')
+        if start is not None:
+            self.observe(self.r2_latency, (model.name,), time.perf_counter() - start)
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_queries = len(get_recorded_queries())
+
+    def _after_request(self, resp):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return resp
+
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        queries = get_recorded_queries()[g.pop('_metrics_queries', 0):]
+        db_time = sum(query.duration for query in queries)
+        slow = [query for query in queries if query.duration >= self.slow_query_threshold]
+
+        with self._lock:
+            self.requests.inc((request.method, endpoint, resp.status_code))
+            self.request_latency.observe((request.method, endpoint), elapsed)
+            self.db_statements.observe((endpoint,), len(queries))
+            self.db_time.observe((endpoint,), db_time)
+            if slow:
+                self.slow_queries.inc((endpoint,), len(slow))
+
+        for query in slow:
+            logger.warning(
+                "event=slow_query endpoint=%s duration_ms=%.1f location=%s statement=%s",
+                endpoint, query.duration * 1000, query.location, " ".join(query.statement.split())
+            )
+
+        return resp
+
+    def observe(self, histogram, values, value):
+        with self._lock:
+            histogram.observe(values, value)
+
+    def inc(self, counter, values, amount=1):
+        with self._lock:
+            counter.inc(values, amount)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for metric in self._metrics:
+                lines.append(f"# HELP {metric.name} {metric.description}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def view(self):
+        # Per-route traffic and error counts are not public: without a
+        # configured token nobody may read them.
+        if not self.token:
+            return response.forbidden("Metrics are disabled until METRICS_TOKEN is set")
+
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {self.token}"):
+            return response.unauthorized("Invalid metrics token")
+
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,142 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidSort(ValueError):
+    pass
+
+
+def indexed_columns(model):
+    """Names of the columns that appear in any B-tree index of ``model``'s
+    table, primary key and unique constraints included. FULLTEXT indexes
+    cannot serve an ORDER BY and are skipped."""
+    table = model.__table__
+    names = {column.key for column in table.primary_key.columns}
+    for index in table.indexes:
+        if index.kwargs.get('mysql_prefix') == 'FULLTEXT':
+            continue
+        names.update(column.key for column in index.columns)
+    for column in table.columns:
+        if column.unique:
+            names.add(column.key)
+    return names
+
+
+class Sorting:
+    """The ``sort=`` values one list endpoint accepts.
+
+    ``sort=price`` is ascending, ``sort=-price`` descending. Only indexed
+    columns may be whitelisted (checked at import time), so no client can
+    make the database sort a full table in memory.
+    """
+
+    def __init__(self, model, columns, default):
+        unindexed = set(columns) - indexed_columns(model)
+        if unindexed:
+            raise ValueError(f"{model.__tablename__} has no index on {', '.join(sorted(unindexed))}")
+
+        self.model = model
+        self.columns = tuple(columns)
+        self.default = default
+
+    def parse(self, value):
+        """Return ``(column, descending)`` for a ``sort=`` value."""
+        value = (value or self.default).strip()
+        descending = value.startswith("-")
+        name = value[1:] if descending else value
+
+        if name not in self.columns:
+            allowed = ", ".join(self.columns)
+            raise InvalidSort(f"Invalid sort, use one of: {allowed} (prefix - for descending)")
+
+        return getattr(self.model, name), descending
+
+
+def encode_cursor(value, last_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+
+    raw = json.dumps([value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_column):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+        if value is not None and sort_column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+    return value, last_id
+
+
+def ordered(query, order_by, descending=True):
+    """Order ``query`` by ``order_by = (sort_column, id_column)`` the way
+    ``paginate`` does, replacing any ordering it already has."""
+    sort_column, id_column = order_by
+    direction = (lambda column: column.desc()) if descending else (lambda column: column.asc())
+    return query.order_by(None).order_by(direction(sort_column), direction(id_column))
+
+
+def paginate(query, page, limit, cursor=None, order_by=None, descending=True):
+    """Paginate a query and return ``(items, pagination)``.
+
+    Rows are ordered by ``order_by = (sort_column, id_column)``, descending
+    unless ``descending=False``; the id tie-break keeps pages stable.
+
+    Without a cursor this is the classic page/limit + total count. Passing
+    ``cursor`` (an empty string for the first page) switches to keyset mode:
+    no OFFSET, no COUNT(*), and ``next_cursor`` is ``None`` on the last page.
+    Keyset mode needs ``order_by``; the cursor encodes its sort column.
+    """
+    if cursor is not None and order_by is None:
+        raise ValueError("paginate() needs order_by when a cursor is given")
+
+    if order_by is not None:
+        sort_column, id_column = order_by
+        query = ordered(query, order_by, descending)
+
+    if cursor is None:
+        pagination = query.paginate(page=page, per_page=limit, error_out=False)
+        return pagination.items, {
+            "page": page,
+            "limit": limit,
+            "total": pagination.total
+        }
+
+    limit = max(limit, 1)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_column)
+        if descending:
+            query = query.filter(or_(
+                sort_column < value,
+                and_(sort_column == value, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > value,
+                and_(sort_column == value, id_column > last_id)
+            ))
+
+    items = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return items, {
+        "limit": limit,
+        "next_cursor": next_cursor
+    }
@@ -0,0 +1,95 @@
+import threading
+import time
+from flask import current_app
+from app import db
+from app.extensions import cache
+from app.models.haircut import Haircut
+
+GENERATION_KEY = 'pricing:gen'
+
+
+class UnknownHaircut(LookupError):
+    def __init__(self, haircut_ids):
+        self.haircut_ids = haircut_ids
+        super().__init__(", ".join(haircut_ids))
+
+
+def parse_flag(value):
+    """``hairwash`` arrives as a JSON bool or the legacy "True"/"False" string."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def parse_price(value):
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Price must be a number")
+    if price < 0:
+        raise ValueError("Price must not be negative")
+    return price
+
+
+class PriceTable:
+    """Haircut prices held in memory per worker.
+
+    Loaded with one query on first use and reloaded after ``refresh()`` or
+    once it is ``PRICE_TABLE_TTL`` seconds old. ``refresh()`` bumps a
+    generation number in the cache backend: with ``CACHE_BACKEND=redis``
+    every worker sees the bump on its next quote, with the default memory
+    backend only the worker that made the change does, and the others pick
+    the new price up when their table expires.
+    """
+
+    def __init__(self):
+        self._prices = None
+        self._generation = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fresh(self, generation):
+        ttl = current_app.config.get('PRICE_TABLE_TTL', 60)
+        return (self._prices is not None and generation == self._generation
+                and time.monotonic() - self._loaded_at < ttl)
+
+    def _current(self):
+        generation = cache.backend.counter(GENERATION_KEY)
+        prices = self._prices
+        if self._fresh(generation):
+            return prices
+
+        with self._lock:
+            if not self._fresh(generation):
+                rows = db.session.query(Haircut.id, Haircut.price).filter(Haircut.deleted_at.is_(None))
+                self._prices = {haircut_id: price or 0.0 for haircut_id, price in rows}
+                self._generation = generation
+                self._loaded_at = time.monotonic()
+            return self._prices
+
+    def refresh(self):
+        """Call after a haircut's price or deleted_at changes."""
+        cache.backend.incr(GENERATION_KEY)
+
+    def quote_many(self, options):
+        """Price ``(haircut_id, hairwash)`` pairs in one pass over the table."""
+        prices = self._current()
+        hairwash_price = float(current_app.config.get('HAIRWASH_PRICE', 0))
+
+        missing = sorted({haircut_id for haircut_id, _ in options if haircut_id not in prices})
+        if missing:
+            raise UnknownHaircut(missing)
+
+        return [{
+            "haircut_id": haircut_id,
+            "hairwash": hairwash,
+            "haircut_price": prices[haircut_id],
+            "hairwash_price": hairwash_price if hairwash else 0.0,
+            "total_price": prices[haircut_id] + (hairwash_price if hairwash else 0.0)
+        } for haircut_id, hairwash in options]
+
+    def quote(self, haircut_id, hairwash):
+        return self.quote_many([(haircut_id, hairwash)])[0]
+
+
+price_table = PriceTable()
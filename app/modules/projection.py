@@ -0,0 +1,156 @@
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+
+# Narrowed views kept per projection, least recently used evicted first.
+MAX_NARROWED = 128
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+class Projection:
+    """Declare the exact payload of an endpoint once, reuse it per request.
+
+    ``fields`` are the model columns to emit (``None`` means every column,
+    like ``to_dict()``), ``computed`` maps extra keys to ``fn(obj)``,
+    ``relations`` maps a relationship name to the projection of its target
+    and ``load`` does the same for relationships that ``computed`` reads but
+    that are not emitted themselves.
+
+    ``requires`` lists the columns a computed key reads, so a view narrowed
+    with ``only()`` still loads them.
+
+    ``options()`` turns the declaration into a query plan: only the declared
+    columns are selected (``load_only``), many-to-one relations are joined and
+    collections are fetched with one ``SELECT ... IN``. ``dump()`` /
+    ``dump_many()`` use a row-to-dict function built once at import time.
+    """
+
+    def __init__(self, model, fields=None, computed=None, relations=None, load=None, requires=None):
+        self.model = model
+        self.fields = tuple(fields) if fields is not None else \
+            tuple(column.key for column in model.__table__.columns)
+        self.prune = fields is not None
+        self.computed = tuple((computed or {}).items())
+        self.relations = tuple((relations or {}).items())
+        self.load = tuple((load or {}).items())
+        self.requires = dict(requires or {})
+        self._extra = ()
+        self._narrowed = OrderedDict()
+        self._narrowed_lock = threading.Lock()
+        self._serialize = self._compile()
+
+    def _compile(self):
+        names = self.fields
+        getter = attrgetter(*names) if names else None
+        computed = self.computed
+        relations = tuple(
+            (name, attrgetter(name), projection._serialize, getattr(self.model, name).property.uselist)
+            for name, projection in self.relations
+        )
+
+        if not names:
+            base = lambda obj: {}
+        elif len(names) == 1:
+            base = lambda obj: {names[0]: getter(obj)}
+        else:
+            base = lambda obj: dict(zip(names, getter(obj)))
+
+        def serialize(obj):
+            data = base(obj)
+            for key, fn in computed:
+                data[key] = fn(obj)
+            for name, get, dump, many in relations:
+                value = get(obj)
+                if many:
+                    data[name] = [dump(child) for child in value]
+                else:
+                    data[name] = dump(value) if value is not None else None
+            return data
+
+        return serialize
+
+    def _columns(self):
+        names = dict.fromkeys(self.fields + self._extra)
+        return [getattr(self.model, name) for name in names]
+
+    def only(self, fields, keep=()):
+        """Narrow the view to a ``fields=`` query value (``"id,name,price"``).
+
+        The result selects only the requested columns, plus ``keep`` and
+        whatever the requested computed keys and relations need, but emits
+        just the requested keys. ``None`` or an empty value returns the view
+        unchanged. Narrowed views are memoised per set of valid fields, at
+        most ``MAX_NARROWED`` of them.
+        """
+        if not fields:
+            return self
+
+        names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        computed = dict(self.computed)
+        relations = dict(self.relations)
+        available = self.fields + tuple(computed) + tuple(relations)
+
+        unknown = [name for name in names if name not in available]
+        if unknown or not names:
+            raise InvalidFields(f"Invalid fields: {', '.join(unknown) or fields}. Available: {', '.join(available)}")
+
+        key = (frozenset(names), tuple(keep))
+        with self._narrowed_lock:
+            narrowed = self._narrowed.get(key)
+            if narrowed is not None:
+                self._narrowed.move_to_end(key)
+                return narrowed
+
+        extra = list(keep)
+        for name in names:
+            extra.extend(self.requires.get(name, ()))
+            if name in relations:
+                extra.extend(column.key for column in getattr(self.model, name).property.local_columns)
+
+        narrowed = Projection(
+            self.model,
+            [name for name in self.fields if name in names],
+            computed={name: fn for name, fn in self.computed if name in names},
+            relations={name: view for name, view in self.relations if name in names},
+            load=dict(self.load),
+            requires=self.requires
+        )
+        narrowed._extra = tuple(name for name in extra if name not in narrowed.fields)
+        with self._narrowed_lock:
+            self._narrowed[key] = narrowed
+            while len(self._narrowed) > MAX_NARROWED:
+                self._narrowed.popitem(last=False)
+        return narrowed
+
+    def _loaders(self):
+        loaders = []
+        for name, projection in self.relations + self.load:
+            attribute = getattr(self.model, name)
+            loader = selectinload(attribute) if attribute.property.uselist else joinedload(attribute)
+            if projection.prune:
+                loader = loader.load_only(*projection._columns())
+            children = projection._loaders()
+            if children:
+                loader = loader.options(*children)
+            loaders.append(loader)
+        return loaders
+
+    def options(self):
+        """Loader options for ``query.options(*projection.options())``."""
+        options = self._loaders()
+        columns = self._columns()
+        if self.prune and columns:
+            options.insert(0, load_only(*columns))
+        return options
+
+    def dump(self, obj):
+        return self._serialize(obj)
+
+    def dump_many(self, objs):
+        serialize = self._serialize
+        return [serialize(obj) for obj in objs]
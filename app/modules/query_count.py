@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from flask_sqlalchemy.record_queries import get_recorded_queries
+
+
+class QueryLog:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def recorded_queries(app):
+    """Collect the SQL statements run inside the block, including the ones
+    from test-client requests (they reuse the app context pushed here).
+
+    Relies on ``SQLALCHEMY_RECORD_QUERIES``.
+    """
+    log = QueryLog()
+    with app.app_context():
+        start = len(get_recorded_queries())
+        try:
+            yield log
+        finally:
+            log.statements = [query.statement for query in get_recorded_queries()[start:]]
+
+
+@contextmanager
+def assert_query_count(app, expected):
+    """Pin an endpoint's statement count::
+
+        with assert_query_count(app, 3):
+            client.get('/api/product-transactions/me', headers=headers)
+    """
+    with recorded_queries(app) as log:
+        yield log
+
+    if log.count != expected:
+        raise AssertionError(
+            f"Expected {expected} queries, got {log.count}:\n" + "\n".join(log.statements)
+        )
@@ -0,0 +1,207 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from app.modules import response
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# JSON bodies of routes with a ``per_email`` rule may be at most this big.
+MAX_PEEK_BYTES = 4096
+
+Rule = namedtuple('Rule', ['scope', 'limit', 'period', 'methods'])
+
+
+class BodyRejected(Exception):
+    """The body cannot be checked against a ``per_email`` rule."""
+
+    def __init__(self, resp):
+        super().__init__(resp.status)
+        self.response = resp
+
+
+def per_ip(limit, period, methods=None):
+    return Rule('ip', limit, period, methods)
+
+
+def per_user(limit, period, methods=None):
+    return Rule('user', limit, period, methods)
+
+
+def per_email(limit, period, methods=None):
+    return Rule('email', limit, period, methods)
+
+
+class MemoryBuckets:
+    """Token buckets for one process, least recently used evicted first."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, period):
+        """Take one token; returns 0 when allowed, otherwise the seconds
+        until a token is available again."""
+        now = time.monotonic()
+        rate = limit / period
+
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * rate)
+
+            retry_after = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return retry_after
+
+
+# KEYS[1] bucket, ARGV limit and period. Uses the server clock so every
+# worker agrees on the refill.
+TOKEN_BUCKET_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or limit
+local updated = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + (now - updated) * limit / period)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) * period / limit
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(period))
+return tostring(retry_after)
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker, for any server speaking the
+    Redis protocol. Each hit is one atomic script call."""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def hit(self, key, limit, period):
+        return float(self._script(keys=[key], args=[limit, period]))
+
+
+class RateLimiter:
+    """Per-route throttling declared in ``app/routes.py``.
+
+    ``limit(blueprint, *rules, view=None)`` attaches rules to every endpoint
+    of a blueprint, or to one view when ``view`` is given. Each rule is a
+    token bucket of ``limit`` requests refilled over ``period`` seconds,
+    keyed by client IP, JWT identity or the ``email`` field of the JSON body.
+    The IP is ``request.remote_addr``; behind a reverse proxy set
+    ``PROXY_FIX_HOPS`` so it is the client's address and not the proxy's.
+
+    The check is an app ``before_request`` hook, so it runs before the view
+    reads the body or touches the database. Rules are applied in the order
+    given; declare ``per_ip`` first so that abusive clients are turned away
+    before anything is decoded. ``per_email`` reads the JSON body (Flask
+    keeps the parsed result for the view); on those routes a JSON body larger
+    than ``MAX_PEEK_BYTES`` is refused with 413 and one without a
+    Content-Length with 400, so padding or chunking cannot skip the rule.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.backend = None
+        self.rules = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+
+        if app.config.get('RATE_LIMIT_BACKEND') == 'redis':
+            self.backend = RedisBuckets(app.config['RATE_LIMIT_REDIS_URL'])
+        else:
+            self.backend = MemoryBuckets(app.config.get('RATE_LIMIT_MAX_KEYS', 100000))
+
+        app.before_request(self.check)
+
+    def limit(self, blueprint, *rules, view=None):
+        self.rules.setdefault((blueprint.name, view), []).extend(rules)
+
+    def _rules_for(self, endpoint):
+        """``(bucket name, rule)`` pairs for ``endpoint``; blueprint-wide
+        rules share one bucket across the blueprint's views."""
+        # Nested blueprints prefix their parent: "api.user.login".
+        parts = endpoint.split('.')
+        if len(parts) < 2:
+            return []
+        blueprint, view = parts[-2], parts[-1]
+        return [(f"{blueprint}.{view}", rule) for rule in self.rules.get((blueprint, view), [])] + \
+            [(blueprint, rule) for rule in self.rules.get((blueprint, None), [])]
+
+    def _identity(self, scope):
+        if scope == 'ip':
+            return request.remote_addr
+
+        if scope == 'user':
+            try:
+                verify_jwt_in_request(optional=True)
+                return get_jwt_identity()
+            except Exception:
+                # Invalid tokens are rejected by the view's jwt_required.
+                return None
+
+        if scope == 'email':
+            # A non-JSON body has no email and is refused by the view.
+            if not request.is_json:
+                return None
+            if request.content_length is None:
+                raise BodyRejected(response.bad_request("Content-Length is required"))
+            if request.content_length > MAX_PEEK_BYTES:
+                raise BodyRejected(response.payload_too_large(f"Request body must be at most {MAX_PEEK_BYTES} bytes"))
+            data = request.get_json(silent=True)
+            email = data.get('email') if isinstance(data, dict) else None
+            return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+        return None
+
+    def check(self):
+        if not self.enabled or request.endpoint is None or request.method == 'OPTIONS':
+            return None
+
+        for bucket, rule in self._rules_for(request.endpoint):
+            if rule.methods and request.method not in rule.methods:
+                continue
+
+            try:
+                identity = self._identity(rule.scope)
+            except BodyRejected as e:
+                return e.response
+            if identity is None:
+                continue
+
+            digest = hashlib.sha1(str(identity).encode()).hexdigest()
+            key = f"ratelimit:{bucket}:{rule.scope}:{rule.limit}/{rule.period}:{digest}"
+            retry_after = self.backend.hit(key, rule.limit, rule.period)
+            if retry_after > 0:
+                resp = response.too_many_requests("Too many requests, please try again later")
+                resp.headers['Retry-After'] = str(math.ceil(retry_after))
+                return resp
+
+        return None
+
+
+limiter = RateLimiter()
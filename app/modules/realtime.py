@@ -0,0 +1,180 @@
+import logging
+import os
+import queue
+
+
+def message_queue_options(config):
+    """Build the ``socketio.init_app`` kwargs for cross-process fan-out.
+
+    ``SOCKETIO_MESSAGE_QUEUE`` takes any URL Flask-SocketIO understands
+    (``redis://``, ``amqp://``, ``kafka://``, ``zmq+tcp://``). The extra
+    ``filesystem:///some/dir`` form uses kombu's file transport as a local
+    broker, so several workers on one host can share rooms without any
+    external service.
+    """
+    url = config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if not url:
+        return {}
+
+    import socketio
+
+    if url.startswith('filesystem://'):
+        folder = url[len('filesystem://'):] or '/tmp/bergas-socketio'
+        data_folder = os.path.join(folder, 'data')
+        control_folder = os.path.join(folder, 'control')
+        os.makedirs(data_folder, exist_ok=True)
+        os.makedirs(control_folder, exist_ok=True)
+
+        return {'client_manager': batched(socketio.KombuManager)(
+            'filesystem://',
+            channel=channel,
+            connection_options={'transport_options': {
+                'data_folder_in': data_folder,
+                'data_folder_out': data_folder,
+                'control_folder': control_folder
+            }}
+        )}
+
+    # Same choice of backend Flask-SocketIO makes for ``message_queue``.
+    if url.startswith(('redis://', 'rediss://')):
+        manager_class = socketio.RedisManager
+    elif url.startswith('kafka://'):
+        manager_class = socketio.KafkaManager
+    elif url.startswith('zmq'):
+        manager_class = socketio.ZmqManager
+    else:
+        manager_class = socketio.KombuManager
+
+    return {'client_manager': batched(manager_class)(url, channel=channel)}
+
+
+class BatchedEmits:
+    """Mixin for a python-socketio pub/sub manager.
+
+    ``emit_batch`` delivers a group of emits to this worker's clients and
+    publishes the whole group to the other workers as one broker message;
+    ``_listen`` unpacks such a message back into the plain emits the
+    listener thread already handles.
+    """
+
+    def emit_batch(self, emits):
+        messages = []
+        for event, data, to in emits:
+            message = {'method': 'emit', 'event': event, 'data': [data], 'binary': False,
+                       'namespace': '/', 'room': to, 'skip_sid': None, 'callback': None,
+                       'host_id': self.host_id}
+            self._handle_emit(message)
+            messages.append(message)
+
+        self._publish({'method': 'emit_batch', 'messages': messages, 'host_id': self.host_id})
+
+    def _listen(self):
+        for message in super()._listen():
+            data = message
+            if not isinstance(data, dict):
+                try:
+                    data = self.json.loads(message)
+                except Exception:
+                    yield message
+                    continue
+
+            if isinstance(data, dict) and data.get('method') == 'emit_batch':
+                yield from data.get('messages', ())
+            else:
+                yield data
+
+
+def batched(manager_class):
+    return type(f"Batched{manager_class.__name__}", (BatchedEmits, manager_class), {})
+
+
+class EmitBuffer:
+    """Queue emits from request handlers and publish them from one
+    background task, so a slow broker never holds up a response.
+
+    The task drains up to ``SOCKETIO_EMIT_BATCH`` pending emits per wake-up
+    and, with a message queue configured, publishes them as one broker
+    message. At most ``SOCKETIO_EMIT_QUEUE_SIZE`` emits wait; past that,
+    while the broker is stalled, new ones are dropped and counted in
+    ``socketio_emits_dropped_total``. With ``SOCKETIO_BUFFERED_EMITS``
+    disabled, emits go out inline.
+    """
+
+    def __init__(self, socketio, metrics=None, max_batch=100, max_queue=10000):
+        self.socketio = socketio
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.buffered = True
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue(max_queue)
+        self._task = None
+
+    def init_app(self, app):
+        self.buffered = app.config.get('SOCKETIO_BUFFERED_EMITS', True)
+        self.max_batch = app.config.get('SOCKETIO_EMIT_BATCH', self.max_batch)
+        self.logger = app.logger
+        self._queue = queue.Queue(app.config.get('SOCKETIO_EMIT_QUEUE_SIZE', self._queue.maxsize))
+
+    def emit(self, event, data, to=None):
+        if not self.buffered:
+            self._publish(event, data, to)
+            return
+
+        try:
+            self._queue.put_nowait((event, data, to))
+        except queue.Full:
+            self._count('socket_emits_dropped', event)
+            self.logger.warning("event=socket_emit_dropped name=%s", event)
+            return
+
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._run)
+
+    def _drain(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _count(self, counter, event):
+        if self.metrics:
+            self.metrics.inc(getattr(self.metrics, counter), (event,))
+
+    def _publish(self, event, data, to):
+        try:
+            self.socketio.emit(event, data, to=to)
+        except Exception:
+            self._count('socket_emit_errors', event)
+            raise
+
+        self._count('socket_emits', event)
+
+    def _publish_batch(self, batch):
+        manager = self.socketio.server.manager
+        if not isinstance(manager, BatchedEmits):
+            # In-process manager: nothing to publish, deliver one by one.
+            for event, data, to in batch:
+                try:
+                    self._publish(event, data, to)
+                except Exception:
+                    self.logger.exception("Socket emit error (%s)", event)
+            return
+
+        try:
+            manager.emit_batch(batch)
+        except Exception:
+            for event, data, to in batch:
+                self._count('socket_emit_errors', event)
+            self.logger.exception("Socket emit batch error (%d events)", len(batch))
+            return
+
+        for event, data, to in batch:
+            self._count('socket_emits', event)
+
+    def _run(self):
+        while True:
+            self._publish_batch(self._drain())
@@ -0,0 +1,144 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app import db
+from app.models.report import SalesRollup, ProductSalesRollup, ReservationRollup
+
+PERIODS = ('hour', 'day')
+
+_KEYS = {
+    SalesRollup: ('period', 'bucket', 'source', 'payment_status'),
+    ProductSalesRollup: ('period', 'bucket', 'product_id'),
+    ReservationRollup: ('period', 'bucket', 'haircut_id'),
+}
+
+_VALUES = {
+    SalesRollup: ('transactions', 'revenue'),
+    ProductSalesRollup: ('units', 'revenue'),
+    ReservationRollup: ('reservations', 'hairwash', 'revenue'),
+}
+
+
+def bucket_start(moment, period):
+    hour = moment.replace(minute=0, second=0, microsecond=0)
+    return hour.replace(hour=0) if period == 'day' else hour
+
+
+def _buckets(moment):
+    return [(period, bucket_start(moment, period)) for period in PERIODS]
+
+
+def _sales_rows(source, transaction, status, sign):
+    for period, bucket in _buckets(transaction.created_at):
+        yield SalesRollup, (period, bucket, source, status), (sign, sign * transaction.total_price)
+
+
+def _product_rows(transaction, lines, sign):
+    yield from _sales_rows('product', transaction, transaction.payment_status, sign)
+
+    for period, bucket in _buckets(transaction.created_at):
+        for product_id, quantity, price in lines:
+            yield ProductSalesRollup, (period, bucket, product_id), (sign * quantity, sign * quantity * price)
+
+
+def _haircut_rows(transaction, sign):
+    yield from _sales_rows('haircut', transaction, transaction.payment_status, sign)
+
+    for period, bucket in _buckets(transaction.created_at):
+        yield ReservationRollup, (period, bucket, transaction.haircut_id), \
+            (sign, sign * int(bool(transaction.hairwash)), sign * transaction.total_price)
+
+
+def _merge(rows, merged=None):
+    merged = {} if merged is None else merged
+    for model, key, deltas in rows:
+        current = merged.get((model, key))
+        merged[(model, key)] = deltas if current is None else tuple(a + b for a, b in zip(current, deltas))
+    return merged
+
+
+def _upsert(model, rows):
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update({
+            name: table.c[name] + stmt.inserted[name] for name in _VALUES[model]
+        })
+    else:
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(_KEYS[model]),
+            set_={name: table.c[name] + stmt.excluded[name] for name in _VALUES[model]}
+        )
+
+    db.session.execute(stmt)
+
+
+def _apply(merged, chunk_size=500):
+    by_model = {}
+    for (model, key), deltas in merged.items():
+        row = dict(zip(_KEYS[model], key))
+        row.update(zip(_VALUES[model], deltas))
+        by_model.setdefault(model, []).append(row)
+
+    for model, rows in by_model.items():
+        for start in range(0, len(rows), chunk_size):
+            _upsert(model, rows[start:start + chunk_size])
+
+
+def record_product_transaction(transaction, lines=None, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) a product transaction from the
+    rollups. ``lines`` are ``(product_id, quantity, price)``; by default they
+    come from ``transaction.items``. Runs in the caller's transaction, after
+    a flush so ``created_at`` is set."""
+    if lines is None:
+        lines = [(item.product_id, item.quantity, item.price_at_purchase) for item in transaction.items]
+    _apply(_merge(_product_rows(transaction, lines, sign)))
+
+
+def record_haircut_transaction(transaction, sign=1):
+    _apply(_merge(_haircut_rows(transaction, sign)))
+
+
+def record_payment_status_change(source, transaction, old_status):
+    """Move a transaction's revenue from ``old_status`` to its current
+    ``payment_status``."""
+    if old_status == transaction.payment_status:
+        return
+
+    _apply(_merge(
+        list(_sales_rows(source, transaction, old_status, -1)) +
+        list(_sales_rows(source, transaction, transaction.payment_status, 1))
+    ))
+
+
+def record_payment_status_changes(source, transactions, new_status):
+    """Batch form of ``record_payment_status_change``: ``transactions`` still
+    carry their old ``payment_status`` and all move to ``new_status`` with
+    one upsert per touched bucket."""
+    merged = {}
+    for transaction in transactions:
+        if transaction.payment_status == new_status:
+            continue
+        _merge(_sales_rows(source, transaction, transaction.payment_status, -1), merged)
+        _merge(_sales_rows(source, transaction, new_status, 1), merged)
+
+    if merged:
+        _apply(merged)
+
+
+def rebuild(product_transactions, haircut_transactions):
+    """Recompute every rollup from scratch; used by ``flask backfill-reports``."""
+    for model in _KEYS:
+        db.session.query(model).delete()
+
+    merged = {}
+    for transaction in product_transactions:
+        lines = [(item.product_id, item.quantity, item.price_at_purchase) for item in transaction.items]
+        _merge(_product_rows(transaction, lines, 1), merged)
+    for transaction in haircut_transactions:
+        _merge(_haircut_rows(transaction, 1), merged)
+
+    _apply(merged)
+    return len(merged)
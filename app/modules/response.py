@@ -56,4 +56,25 @@ def conflict(message):
         'status': 'fail',
         'message': message
     }
-    return make_response(jsonify(res), 409)
\ No newline at end of file
+    return make_response(jsonify(res), 409)
+
+def payload_too_large(message):
+    res = {
+        'status': 'fail',
+        'message': message
+    }
+    return make_response(jsonify(res), 413)
+
+def unprocessable_entity(message):
+    res = {
+        'status': 'fail',
+        'message': message
+    }
+    return make_response(jsonify(res), 422)
+
+def too_many_requests(message):
+    res = {
+        'status': 'fail',
+        'message': message
+    }
+    return make_response(jsonify(res), 429)
\ No newline at end of file
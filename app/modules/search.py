@@ -0,0 +1,279 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from flask import current_app
+from sqlalchemy.dialects.mysql import match
+from app import db
+from app.extensions import cache
+from app.models.product import Product
+from app.models.haircut import Haircut
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+FIELD_WEIGHTS = {'name': 3.0, 'description': 1.0}
+PREFIX_FACTOR = 0.5
+
+# Longer rankings are intersected with the filtered ids in Python.
+MAX_IN_IDS = 1000
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def fulltext_terms(q):
+    """``"pomade str"`` -> ``"+pomade* +str*"``: every word required, each
+    matched as a prefix, same semantics as the in-memory index."""
+    return " ".join(f"+{term}*" for term in tokenize(q))
+
+
+class SearchIndex:
+    """Inverted index over ``name``/``description`` of one model.
+
+    ``postings`` maps a token to ``{doc_id: weight}`` and ``vocabulary`` is
+    the sorted token list, so a query word matches every token it is a
+    prefix of with one bisect. A document must match every query word; its
+    score is the sum of the best field weight per word, halved for prefix
+    (not exact) matches.
+
+    Built on startup and kept current by ``upsert``/``remove`` from the
+    write handlers. Writes also bump a generation number in the cache
+    backend: with ``CACHE_BACKEND=redis`` a worker that missed another
+    worker's write rebuilds on its next search. The default memory backend
+    is per process, so there the other workers only catch up when their
+    index is ``SEARCH_INDEX_TTL`` seconds old and is rebuilt.
+    Past ``SEARCH_INDEX_MAX_DOCS`` rows on MySQL the index stays empty and
+    ``search`` returns ``None``: the caller falls back to FULLTEXT.
+    """
+
+    def __init__(self, model, namespace):
+        self.model = model
+        self.namespace = namespace
+        self._docs = None
+        self._postings = {}
+        self._vocabulary = []
+        self._generation = None
+        self._built_at = 0.0
+        self.use_fulltext = False
+        self._lock = threading.RLock()
+
+    @property
+    def _generation_key(self):
+        return f"search:{self.namespace}:gen"
+
+    def _fulltext_available(self):
+        return db.engine.dialect.name == 'mysql'
+
+    def build(self):
+        model = self.model
+        generation = cache.backend.counter(self._generation_key)
+        live = db.session.query(model.id, model.name, model.description) \
+            .filter(model.deleted_at.is_(None))
+        # Counted first so the periodic rebuild of a FULLTEXT-sized catalog
+        # never loads its rows.
+        use_fulltext = (
+            self._fulltext_available()
+            and live.order_by(None).count() > current_app.config.get('SEARCH_INDEX_MAX_DOCS', 20000)
+        )
+        rows = [] if use_fulltext else live.all()
+
+        with self._lock:
+            self._docs = {}
+            self._postings = {}
+            self._vocabulary = []
+            self._generation = generation
+            self._built_at = time.monotonic()
+            self.use_fulltext = use_fulltext
+            if self.use_fulltext:
+                return
+
+            for doc_id, name, description in rows:
+                self._add(doc_id, name, description)
+
+    def _add(self, doc_id, name, description):
+        weights = {}
+        for field, text in (('name', name), ('description', description)):
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0.0), FIELD_WEIGHTS[field])
+
+        self._docs[doc_id] = (name or "").lower(), tuple(weights)
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocabulary, token)
+            postings[doc_id] = weight
+
+    def _discard(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+
+        for token in doc[1]:
+            postings = self._postings[token]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _bump(self):
+        generation = cache.backend.incr(self._generation_key)
+        if self._generation is not None and generation == self._generation + 1:
+            self._generation = generation
+        else:
+            # Someone else wrote in between; rebuild on the next search.
+            self._generation = None
+
+    def _stale(self):
+        ttl = current_app.config.get('SEARCH_INDEX_TTL', 60)
+        return (self._docs is None
+                or self._generation != cache.backend.counter(self._generation_key)
+                or time.monotonic() - self._built_at >= ttl)
+
+    def upsert(self, obj):
+        """Call after ``obj`` is committed (created or its text changed)."""
+        with self._lock:
+            if self._docs is not None and not self.use_fulltext:
+                self._discard(obj.id)
+                if obj.deleted_at is None:
+                    self._add(obj.id, obj.name, obj.description)
+            self._bump()
+
+    def remove(self, doc_id):
+        """Call after a soft or hard delete is committed."""
+        with self._lock:
+            if self._docs is not None and not self.use_fulltext:
+                self._discard(doc_id)
+            self._bump()
+
+    def _matches(self, term):
+        vocabulary = self._vocabulary
+        scores = {}
+        index = bisect_left(vocabulary, term)
+        while index < len(vocabulary) and vocabulary[index].startswith(term):
+            token = vocabulary[index]
+            factor = 1.0 if token == term else PREFIX_FACTOR
+            for doc_id, weight in self._postings[token].items():
+                score = weight * factor
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+            index += 1
+        return scores
+
+    def search(self, q, limit=None):
+        """Ranked ids for ``q``, best first, or ``None`` when the catalog is
+        too large for memory and the caller should use FULLTEXT instead."""
+        terms = list(dict.fromkeys(tokenize(q)))
+        if not terms:
+            raise InvalidSearch("Search query must contain a letter or digit")
+
+        with self._lock:
+            if self._stale():
+                self.build()
+            if self.use_fulltext:
+                return None
+
+            totals = None
+            for term in terms:
+                scores = self._matches(term)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {doc_id: totals[doc_id] + score
+                              for doc_id, score in scores.items() if doc_id in totals}
+                if not totals:
+                    return []
+
+            ranked = sorted(totals, key=lambda doc_id: (-totals[doc_id], self._docs[doc_id][0], doc_id))
+
+        return ranked[:limit] if limit else ranked
+
+    def fulltext_clause(self, q):
+        terms = fulltext_terms(q)
+        if not terms:
+            raise InvalidSearch("Search query must contain a letter or digit")
+        return match(self.model.name, self.model.description, against=terms).in_boolean_mode()
+
+
+def search_page(index, query, q, page, limit, order_by=None):
+    """Page through ``query`` restricted to matches for ``q``.
+
+    In-memory mode fetches the ids that survive the caller's SQL filters in
+    one query, keeps the index ranking, then loads only the requested page.
+    The whole ranking is filtered before ``SEARCH_MAX_RESULTS`` caps it, so
+    the filters never miss a lower-ranked match. FULLTEXT mode orders by
+    MySQL's relevance score instead. An explicit
+    ``order_by = (sort_column, id_column, descending)`` replaces relevance.
+    """
+    model = index.model
+    page = max(page, 1)
+    limit = max(limit, 1)
+    max_results = current_app.config.get('SEARCH_MAX_RESULTS', 500)
+
+    ordering = None
+    if order_by is not None:
+        sort_column, id_column, descending = order_by
+        ordering = (sort_column.desc(), id_column.desc()) if descending else (sort_column.asc(), id_column.asc())
+
+    ranked = index.search(q)
+    if ranked is None:
+        clause = index.fulltext_clause(q)
+        pagination = query.filter(clause) \
+            .order_by(None) \
+            .order_by(*(ordering or (clause.desc(),))) \
+            .paginate(page=page, per_page=limit, error_out=False)
+        return pagination.items, {"page": page, "limit": limit, "total": pagination.total}
+
+    if not ranked:
+        return [], {"page": page, "limit": limit, "total": 0}
+
+    matching = query.with_entities(model.id).order_by(None)
+    if len(ranked) <= MAX_IN_IDS:
+        matching = matching.filter(model.id.in_(ranked))
+    # Otherwise every filtered id is read and intersected here, which the
+    # SEARCH_INDEX_MAX_DOCS bound on the index keeps small enough.
+    if ordering:
+        matched = set(ranked)
+        ordered = [doc_id for (doc_id,) in matching.order_by(*ordering) if doc_id in matched]
+    else:
+        allowed = {doc_id for (doc_id,) in matching}
+        ordered = [doc_id for doc_id in ranked if doc_id in allowed]
+    ordered = ordered[:max_results]
+    page_ids = ordered[(page - 1) * limit:page * limit]
+
+    rows = {row.id: row for row in query.filter(model.id.in_(page_ids)).order_by(None)} if page_ids else {}
+    items = [rows[doc_id] for doc_id in page_ids if doc_id in rows]
+
+    return items, {"page": page, "limit": limit, "total": len(ordered)}
+
+
+class Search:
+    def __init__(self):
+        self.indexes = {}
+
+    def register(self, model, namespace):
+        index = self.indexes[namespace] = SearchIndex(model, namespace)
+        return index
+
+    def init_app(self, app):
+        """Build every index up front. A database without the tables yet
+        (``flask db upgrade`` on a fresh install) leaves them to build on
+        first search instead."""
+        with app.app_context():
+            try:
+                for index in self.indexes.values():
+                    index.build()
+            except Exception:
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+search = Search()
+product_index = search.register(Product, 'products')
+haircut_index = search.register(Haircut, 'haircuts')
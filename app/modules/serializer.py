@@ -0,0 +1,22 @@
+from operator import attrgetter
+
+_compiled = {}
+
+
+def _compile(model):
+    names = tuple(column.key for column in model.__table__.columns)
+    getter = attrgetter(*names)
+
+    if len(names) == 1:
+        return lambda obj: {names[0]: getter(obj)}
+
+    return lambda obj: dict(zip(names, getter(obj)))
+
+
+def columns_to_dict(obj):
+    """Same result as ``{c.name: getattr(obj, c.name) for c in columns}``,
+    but the column list and getter are built once per model class."""
+    serialize = _compiled.get(type(obj))
+    if serialize is None:
+        serialize = _compiled[type(obj)] = _compile(type(obj))
+    return serialize(obj)
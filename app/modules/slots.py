@@ -0,0 +1,162 @@
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.extensions import cache
+from app.models.haircut_transactions import ReservationSlot
+from app.modules.time import get_wib_time
+
+WIB = timezone(timedelta(hours=7))
+
+Schedule = namedtuple('Schedule', ['open', 'close', 'slot_minutes', 'chairs', 'closed_weekdays'])
+
+
+class InvalidSlot(ValueError):
+    pass
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def get_schedule():
+    config = current_app.config
+    closed = config.get('SHOP_CLOSED_WEEKDAYS', '')
+    return Schedule(
+        open=datetime.strptime(config.get('SHOP_OPEN_TIME', '09:00'), '%H:%M').time(),
+        close=datetime.strptime(config.get('SHOP_CLOSE_TIME', '21:00'), '%H:%M').time(),
+        slot_minutes=int(config.get('SHOP_SLOT_MINUTES', 60)),
+        chairs=int(config.get('SHOP_CHAIRS', 2)),
+        closed_weekdays={int(day) for day in str(closed).split(',') if day.strip()}
+    )
+
+
+def slot_starts(day, schedule):
+    """Every slot start on ``day`` that ends by closing time."""
+    if day.weekday() in schedule.closed_weekdays:
+        return []
+
+    step = timedelta(minutes=schedule.slot_minutes)
+    current = datetime.combine(day, schedule.open)
+    close = datetime.combine(day, schedule.close)
+
+    starts = []
+    while current + step <= close:
+        starts.append(current)
+        current += step
+    return starts
+
+
+def parse_reservation_time(value):
+    """Accept ISO 8601 (``2026-10-20 14:00:00``, ``...T07:00:00Z``) and
+    return a naive WIB datetime, the way every other timestamp is stored."""
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        try:
+            moment = datetime.fromisoformat(str(value))
+        except ValueError:
+            raise InvalidSlot("Invalid reservation_time, use ISO 8601")
+
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(WIB).replace(tzinfo=None)
+    return moment
+
+
+def validate_slot(moment, schedule):
+    if moment not in slot_starts(moment.date(), schedule):
+        raise InvalidSlot("reservation_time is not a bookable slot")
+    if moment <= get_wib_time():
+        raise InvalidSlot("reservation_time must be in the future")
+
+
+def _cache_key(day):
+    return f"availability:{day.isoformat()}"
+
+
+def _booked(day):
+    """``{"HH:MM": occupied chairs}`` for ``day``: one range scan over the
+    slot primary key, cached until a booking on that day changes."""
+    key = _cache_key(day)
+    cached = cache.backend.get(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    start = datetime.combine(day, datetime.min.time())
+    rows = db.session.query(ReservationSlot.slot_start, func.count()) \
+        .filter(ReservationSlot.slot_start >= start, ReservationSlot.slot_start < start + timedelta(days=1)) \
+        .group_by(ReservationSlot.slot_start) \
+        .all()
+
+    booked = {slot_start.strftime('%H:%M'): count for slot_start, count in rows}
+    cache.backend.set(key, json.dumps(booked), cache.ttl)
+    return booked
+
+
+def availability(day):
+    schedule = get_schedule()
+    booked = _booked(day)
+    now = get_wib_time()
+
+    slots = []
+    for start in slot_starts(day, schedule):
+        label = start.strftime('%H:%M')
+        free = 0 if start <= now else max(schedule.chairs - booked.get(label, 0), 0)
+        slots.append({
+            "time": label,
+            "start": start.isoformat(),
+            "available": free
+        })
+
+    return {
+        "date": day.isoformat(),
+        "slot_minutes": schedule.slot_minutes,
+        "chairs": schedule.chairs,
+        "slots": slots
+    }
+
+
+def reserve_slot(transaction_id, moment):
+    """Claim a free chair for ``moment`` inside the caller's transaction.
+
+    Each attempt is an INSERT in its own savepoint; the (slot_start, chair)
+    primary key turns a concurrent claim of the same chair into an
+    IntegrityError, so two requests can never hold one chair.
+    """
+    schedule = get_schedule()
+    taken = {chair for (chair,) in db.session.query(ReservationSlot.chair).filter_by(slot_start=moment)}
+
+    for chair in range(1, schedule.chairs + 1):
+        if chair in taken:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(ReservationSlot).values(
+                    slot_start=moment,
+                    chair=chair,
+                    transaction_id=transaction_id
+                ))
+            return chair
+        except IntegrityError:
+            continue
+
+    raise SlotUnavailable("Selected slot is fully booked")
+
+
+def release_slot(transaction_id):
+    release_slots([transaction_id])
+
+
+def release_slots(transaction_ids):
+    if transaction_ids:
+        db.session.query(ReservationSlot) \
+            .filter(ReservationSlot.transaction_id.in_(transaction_ids)) \
+            .delete(synchronize_session=False)
+
+
+def invalidate_day(moment):
+    if moment is not None:
+        cache.backend.delete(_cache_key(moment.date()))
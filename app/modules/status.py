@@ -0,0 +1,102 @@
+class InvalidStatus(ValueError):
+    pass
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+class ConcurrentUpdate(Exception):
+    """The row's ``version`` moved on since it was read."""
+
+
+class StateMachine:
+    """Allowed moves for one status column.
+
+    ``transitions`` maps every state to the states it may move to, the first
+    one being the state new rows start in; setting the current value again
+    is always allowed. Rows still holding a value from before the machine
+    existed may move to any known state.
+    """
+
+    def __init__(self, field, transitions):
+        self.field = field
+        self.transitions = {state: frozenset(targets) for state, targets in transitions.items()}
+
+    @property
+    def states(self):
+        return tuple(self.transitions)
+
+    @property
+    def initial(self):
+        return next(iter(self.transitions))
+
+    def can(self, current, new):
+        if new not in self.transitions:
+            return False
+        if new == current or current not in self.transitions:
+            return True
+        return new in self.transitions[current]
+
+    def require_known(self, new):
+        if new not in self.transitions:
+            raise InvalidStatus(f"Invalid {self.field} '{new}', use one of: {', '.join(self.states)}")
+
+    def check(self, current, new):
+        self.require_known(new)
+        if not self.can(current, new):
+            raise InvalidTransition(f"{self.field} cannot change from '{current}' to '{new}'")
+
+
+PAYMENT_STATUS = StateMachine('payment_status', {
+    'unpaid': ('received', 'paid'),
+    'received': ('paid', 'unpaid'),
+    'paid': (),
+})
+
+EXPEDITION_STATUS = StateMachine('expedition_status', {
+    'pending': ('processing', 'shipping'),
+    'processing': ('shipping',),
+    'shipping': ('delivered',),
+    'delivered': (),
+})
+
+RESERVATION_STATUS = StateMachine('reservation_status', {
+    'pending': ('confirmed', 'completed', 'cancelled'),
+    'confirmed': ('completed', 'cancelled'),
+    'cancelled': ('pending', 'confirmed'),
+    'completed': (),
+})
+
+
+PRODUCT_TRANSACTION_STATUSES = {
+    'payment_status': PAYMENT_STATUS,
+    'expedition_status': EXPEDITION_STATUS,
+}
+
+HAIRCUT_TRANSACTION_STATUSES = {
+    'reservation_status': RESERVATION_STATUS,
+    'payment_status': PAYMENT_STATUS,
+}
+
+
+def validate_changes(machines, current, changes):
+    """Check every ``{field: new}`` in ``changes`` against its machine;
+    ``current`` is the row (or any object) holding the present values."""
+    for field, new in changes.items():
+        machines[field].check(getattr(current, field), new)
+
+
+def expect_version(obj, expected):
+    """Compare a client-supplied ``version`` with the loaded row. The write
+    itself is still guarded by ``WHERE version = :loaded`` (the mapper's
+    ``version_id_col``), which catches races after this check."""
+    if expected is None:
+        return
+    try:
+        expected = int(expected)
+    except (TypeError, ValueError):
+        raise InvalidStatus("version must be an integer")
+    if expected != obj.version:
+        raise ConcurrentUpdate()
+
@@ -0,0 +1,93 @@
+from sqlalchemy import case, select, update
+from app import db
+from app.models.product import Product
+
+
+class StockReservationError(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(", ".join(
+            f"'{failure['name']}' (available: {failure['available'] or 0})"
+            for failure in failures
+        ))
+
+
+def _collect(quantities):
+    totals = {}
+    for product_id, quantity in quantities:
+        totals[product_id] = totals.get(product_id, 0) + quantity
+
+    return dict(sorted(totals.items()))
+
+
+def _shortages(totals):
+    rows = db.session.execute(
+        select(Product.id, Product.name, Product.stock)
+        .where(Product.id.in_(totals))
+    ).all()
+    stock = {row.id: row for row in rows}
+
+    failures = []
+    for product_id, quantity in totals.items():
+        row = stock.get(product_id)
+        if row is None or row.stock < quantity:
+            failures.append({
+                'product_id': product_id,
+                'name': row.name if row else product_id,
+                'requested': quantity,
+                'available': row.stock if row else None
+            })
+
+    return failures
+
+
+def ensure_available(quantities):
+    """Raise StockReservationError if any ``(product_id, quantity)`` pair
+    exceeds the current stock. Nothing is reserved."""
+    failures = _shortages(_collect(quantities))
+    if failures:
+        raise StockReservationError(failures)
+
+
+def reserve_stock(quantities):
+    """Decrement stock for every ``(product_id, quantity)`` pair in one
+    conditional UPDATE, all or nothing.
+
+    Rows are matched through the primary key in ascending id order, so two
+    overlapping carts always lock in the same order and cannot deadlock. On a
+    shortfall the savepoint is rolled back and StockReservationError lists
+    every item that could not be covered.
+    """
+    totals = _collect(quantities)
+    if not totals:
+        return
+
+    requested = case(totals, value=Product.id)
+    stmt = update(Product) \
+        .where(Product.id.in_(totals), Product.stock >= requested) \
+        .values(stock=Product.stock - requested) \
+        .execution_options(synchronize_session=False)
+
+    savepoint = db.session.begin_nested()
+    result = db.session.execute(stmt)
+
+    if result.rowcount != len(totals):
+        savepoint.rollback()
+        raise StockReservationError(_shortages(totals))
+
+    savepoint.commit()
+
+
+def release_stock(quantities):
+    """Give reserved stock back, e.g. when a transaction is deleted."""
+    totals = _collect(quantities)
+    if not totals:
+        return
+
+    released = case(totals, value=Product.id)
+    db.session.execute(
+        update(Product)
+        .where(Product.id.in_(totals))
+        .values(stock=Product.stock + released)
+        .execution_options(synchronize_session=False)
+    )
@@ -1,31 +1,128 @@
+import io
 import uuid
+from flask import current_app
 from werkzeug.utils import secure_filename
 from r2_config import s3, R2_BUCKET, R2_PUBLIC
+from app.modules.background import submit
+from app.modules.image_variants import generate_variants, variant_keys
 
-def upload_image(name: str, file, folder: str):
-    if not file or not file.filename:
-        raise ValueError("No file provided")
+PRESIGN_EXPIRES = 900
+
+
+class UploadError(ValueError):
+    pass
 
-    ext = file.filename.rsplit(".", 1)[-1].lower()
+
+def _build_key(name: str, filename: str, folder: str):
+    ext = filename.rsplit(".", 1)[-1].lower()
     safe_name = secure_filename(name)
     unique_name = f"{safe_name}.{ext}"
 
-    key = f"{folder}/{unique_name}"
+    return unique_name, f"{folder}/{unique_name}"
+
+
+def _generate_variants(key: str, body: bytes = None):
+    """Returns whether every variant was stored."""
+    try:
+        generate_variants(key, body)
+        return True
+    except Exception as e:
+        current_app.logger.error("Image variant error for %s: %s", key, e)
+        return False
+
+
+def _upload_bytes(body: bytes, key: str, content_type: str, result: dict, on_complete, variants: bool, on_error):
+    try:
+        s3.upload_fileobj(
+            io.BytesIO(body),
+            R2_BUCKET,
+            key,
+            ExtraArgs={"ContentType": content_type}
+        )
+    except Exception as e:
+        current_app.logger.error("Image upload error for %s: %s", key, e)
+        if on_error:
+            on_error()
+        return
+
+    variants_ready = _generate_variants(key, body) if variants else False
+
+    if on_complete:
+        on_complete({**result, "variants_ready": variants_ready})
+
+
+def upload_image_async(name: str, file, folder: str, on_complete=None, variants: bool = False, on_error=None):
+    """Queue the upload on the background pool and return its future
+    ``{"filename", "url", "key"}`` right away.
+
+    The request body is read into memory first because the upload outlives
+    the request stream. ``on_complete(result)`` runs once the object is
+    stored, inside an app context, and is where rows get finalised. With
+    ``variants`` the resized copies are generated before that callback and
+    ``result["variants_ready"]`` says whether they all were. A failed upload
+    is logged and calls ``on_error()`` instead.
+    """
+    if not file or not file.filename:
+        raise ValueError("No file provided")
+
+    unique_name, key = _build_key(name, file.filename, folder)
+    result = {"filename": unique_name, "url": f"{R2_PUBLIC}/{key}", "key": key}
+
+    submit(_upload_bytes, file.read(), key, file.content_type, result, on_complete, variants, on_error)
+
+    return result
 
-    s3.upload_fileobj(
-        file,
-        R2_BUCKET,
-        key,
-        ExtraArgs={"ContentType": file.content_type}
+
+def presign_upload(filename: str, content_type: str, folder: str):
+    """Hand out a presigned PUT so the client uploads straight to the bucket."""
+    if not filename or "." not in filename:
+        raise UploadError("Filename with extension is required")
+
+    unique_name, key = _build_key(uuid.uuid4().hex, filename, folder)
+
+    upload_url = s3.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": R2_BUCKET, "Key": key, "ContentType": content_type},
+        ExpiresIn=PRESIGN_EXPIRES
     )
 
-    public_url = f"{R2_PUBLIC}/{key}"
+    return {
+        "filename": unique_name,
+        "url": f"{R2_PUBLIC}/{key}",
+        "key": key,
+        "upload_url": upload_url,
+        "expires_in": PRESIGN_EXPIRES
+    }
+
 
-    return {"filename": unique_name, "url": public_url, "key": key}
+def claim_uploaded_image(key: str, folder: str):
+    """Validate a key returned by ``presign_upload`` once the client has PUT it."""
+    if not key or not key.startswith(f"{folder}/") or ".." in key:
+        raise UploadError("Invalid upload key")
+
+    try:
+        s3.head_object(Bucket=R2_BUCKET, Key=key)
+    except s3.exceptions.ClientError:
+        raise UploadError("Uploaded file not found")
+
+    return {"filename": key.rsplit("/", 1)[-1], "url": f"{R2_PUBLIC}/{key}", "key": key}
+
+
+def _variants_then(key: str, on_complete):
+    ready = _generate_variants(key)
+    if on_complete:
+        on_complete(ready)
+
+
+def generate_variants_async(key: str, on_complete=None):
+    """Render the variants of an already stored image (e.g. a claimed
+    presigned upload) in the background, then call ``on_complete(ready)``.
+    Call it after the row pointing at ``key`` is committed."""
+    submit(_variants_then, key, on_complete)
 
 
 def delete_image(key: str):
-    s3.delete_object(
+    s3.delete_objects(
         Bucket=R2_BUCKET,
-        Key=key
-    )
\ No newline at end of file
+        Delete={"Objects": [{"Key": item} for item in [key, *variant_keys(key)]], "Quiet": True}
+    )
@@ -6,6 +6,9 @@ from app.controllers.product_controller import product_bp
 from app.controllers.haircut_transaction_controller import haircut_transaction_bp
 from app.controllers.product_transaction_controller import product_transaction_bp
 from app.controllers.cart_controller import cart_bp
+from app.controllers.upload_controller import upload_bp
+from app.controllers.report_controller import report_bp
+from app.modules.rate_limit import limiter, per_ip, per_user, per_email, WRITE_METHODS
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
@@ -49,4 +52,17 @@ api.register_blueprint(haircut_bp)
 api.register_blueprint(product_bp)
 api.register_blueprint(haircut_transaction_bp)
 api.register_blueprint(product_transaction_bp)
-api.register_blueprint(cart_bp)
\ No newline at end of file
+api.register_blueprint(cart_bp)
+api.register_blueprint(upload_bp)
+api.register_blueprint(report_bp)
+
+# Password hashing makes every login/register attempt expensive, so these are
+# throttled per IP before anything else; checkout and reservations per user.
+limiter.limit(user_bp, per_ip(10, 60), per_email(5, 300), view='login')
+limiter.limit(user_bp, per_ip(5, 60), view='register')
+limiter.limit(user_bp, per_user(5, 300), view='change_password')
+limiter.limit(product_transaction_bp, per_ip(30, 60), per_user(10, 60), view='create_product_transaction')
+limiter.limit(haircut_transaction_bp, per_ip(30, 60), per_user(10, 60), view='create_haircut_transaction')
+
+for write_bp in (cart_bp, upload_bp, product_transaction_bp, haircut_transaction_bp):
+    limiter.limit(write_bp, per_user(120, 60, methods=WRITE_METHODS))
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""Latency and SQL statements of admin list endpoints, before and after the
+role moved into the JWT claims.
+
+* ``lookup``: the old behaviour, the admin's User row is read on every
+  request (emulated by emptying the role cache before each one).
+* ``ttl-cache``: the default memory cache backend; the role comes from the
+  per-worker cache and is looked up once per ``ROLE_TTL``.
+* ``claims``: a shared (Redis) cache backend; the role is read from the
+  token. Emulated with an in-process marker store.
+
+    python bench/admin_auth.py [--requests 300]
+"""
+import argparse
+
+from common import StatementCounter, login, make_app, make_user, median
+
+ENDPOINTS = ('/api/user', '/api/product-transactions', '/api/haircut-transactions')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    app = make_app()
+    from app.extensions import db
+    from app.modules import auth
+    from app.modules.cache import MemoryCache
+
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+
+    make_user(app, 'admin@example.com', role='admin')
+    client = app.test_client()
+    headers = login(client, 'admin@example.com')
+
+    def lookup():
+        auth._roles = MemoryCache(max_entries=4096)
+
+    markers = MemoryCache()
+    modes = {
+        'lookup': (lookup, lambda: None),
+        'ttl-cache': (lambda: None, lambda: None),
+        'claims': (lambda: None, lambda: markers),
+    }
+
+    print(f"{'mode':<10} {'endpoint':<28} {'statements':>10}  {'median ms':>9}")
+    default_markers = auth._markers
+    for mode, (before_request, shared_markers) in modes.items():
+        auth._markers = shared_markers
+        lookup()
+        for endpoint in ENDPOINTS:
+            statements, seconds = [], []
+            for _ in range(args.requests):
+                before_request()
+                with counter.measure() as result:
+                    resp = client.get(f"{endpoint}?limit=10", headers=headers)
+                assert resp.status_code == 200, resp.get_json()
+                statements.append(result['statements'])
+                seconds.append(result['seconds'])
+            print(f"{mode:<10} {endpoint:<28} {median(statements):>10}  {median(seconds) * 1000:>9.2f}")
+    auth._markers = default_markers
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""SQL statements and latency of a cart checkout for carts of 1, 10 and 100
+lines. The checkout should cost the same number of statements whatever the
+cart size.
+
+    python bench/checkout_statements.py [--runs 5] [--lines 1 10 100]
+"""
+import argparse
+
+from common import StatementCounter, login, make_app, make_user, median
+
+
+def fill_cart(app, user_id, product_ids):
+    from app.extensions import db
+    from app.models.product_transactions import CartItem
+
+    with app.app_context():
+        db.session.add_all(CartItem(user_id=user_id, product_id=product_id, quantity=1) for product_id in product_ids)
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+
+    app = make_app()
+    from app.extensions import db
+    from app.models.product import Product
+
+    with app.app_context():
+        products = [Product(name=f"Product {i}", description="bench", price=10000, stock=10 ** 6,
+                            image_url='x', image_key='k') for i in range(max(args.lines))]
+        db.session.add_all(products)
+        db.session.commit()
+        product_ids = [product.id for product in products]
+        counter = StatementCounter(db.engine)
+
+    user_id = make_user(app, 'buyer@example.com')
+    client = app.test_client()
+    headers = login(client, 'buyer@example.com')
+    body = {'shipping_address': 'Jl. Sudirman 1', 'expedition_service': 'JNE'}
+
+    print(f"{'lines':>5}  {'statements':>10}  {'median ms':>9}")
+    for lines in args.lines:
+        statements, seconds = [], []
+        for _ in range(args.runs):
+            fill_cart(app, user_id, product_ids[:lines])
+            with counter.measure() as result:
+                resp = client.post('/api/product-transactions/checkout', json=body, headers=headers)
+            assert resp.status_code == 201, resp.get_json()
+            statements.append(result['statements'])
+            seconds.append(result['seconds'])
+        print(f"{lines:>5}  {median(statements):>10}  {median(seconds) * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Shared setup for the benchmarks: the app on an in-memory SQLite database,
+seeded accounts and a statement counter. Run scripts from the repo root,
+e.g. ``python bench/checkout_statements.py``."""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('SECRET_API_KEY', 'bench-permission-key')
+os.environ.setdefault('SECRET_KEY', 'bench-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret-key-long-enough-for-hs256')
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+os.environ.setdefault('BACKGROUND_TASKS', 'false')
+os.environ.setdefault('CHOOSEN_COUNT_BUFFERED', 'false')
+os.environ.setdefault('SOCKETIO_BUFFERED_EMITS', 'false')
+os.environ.setdefault('METRICS_ENABLED', 'false')
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from config import Config
+
+PERMISSION = {'Permission-Key': os.environ['SECRET_API_KEY']}
+PASSWORD = 'secret123'
+
+
+def make_app():
+    Config.SQLALCHEMY_DATABASE_URI = os.getenv('BENCH_DATABASE_URL', 'sqlite://')
+
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def make_user(app, email, role='user'):
+    from app.extensions import db
+    from app.models.user import User
+
+    with app.app_context():
+        user = User(name=email.split('@')[0], email=email, password=generate_password_hash(PASSWORD), role=role)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def login(client, email):
+    resp = client.post('/api/user/login', json={'email': email, 'password': PASSWORD}, headers=PERMISSION)
+    return {**PERMISSION, 'Authorization': f"Bearer {resp.get_json()['data']['token']}"}
+
+
+class StatementCounter:
+    """Counts the SQL statements sent through ``engine``."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+    @contextmanager
+    def measure(self):
+        result = {'statements': self.count, 'seconds': time.perf_counter()}
+        yield result
+        result['statements'] = self.count - result['statements']
+        result['seconds'] = time.perf_counter() - result['seconds']
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
@@ -0,0 +1,82 @@
+"""Serializing 1,000 ProductTransactions with their items into the response
+envelope: the stdlib provider with a per-row column walk (the old path)
+against the orjson provider with precompiled serializers.
+
+    python bench/serialize_transactions.py [--transactions 1000] [--items 3] [--runs 20]
+"""
+import argparse
+import timeit
+
+from common import make_app, median
+
+
+def build(count, items_per_transaction):
+    from app.models.product import Product
+    from app.models.product_transactions import ProductTransaction, TransactionItem
+    from app.modules.time import get_wib_time
+
+    now = get_wib_time()
+    product = Product(id='p' * 36, name="Pomade", price=85000.0, image_url="https://cdn/pomade.jpg")
+    transactions = []
+    for i in range(count):
+        transaction = ProductTransaction(
+            id=f"{i:036d}", user_id='u' * 36, total_price=255000.0, expedition_cost=15000.0,
+            shipping_address="Jl. Sudirman 1", expedition_service="JNE", expedition_status="pending",
+            payment_method="qris", payment_status="unpaid", created_at=now, updated_at=now, version=1
+        )
+        transaction.items = [
+            TransactionItem(id=f"{i:030d}{j:06d}", product_id=product.id, product=product,
+                            quantity=1, price_at_purchase=85000.0)
+            for j in range(items_per_transaction)
+        ]
+        transactions.append(transaction)
+    return transactions
+
+
+def column_walk(transaction):
+    # to_dict() before precompiled serializers.
+    data = {column.name: getattr(transaction, column.name) for column in transaction.__table__.columns}
+    data['items'] = [item.to_dict() for item in transaction.items]
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transactions', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=3)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app()
+    from flask.json.provider import DefaultJSONProvider
+    from app.controllers.product_transaction_controller import TRANSACTION_VIEW
+    from app.modules.json_provider import OrjsonProvider, orjson
+
+    transactions = build(args.transactions, args.items)
+    stdlib = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app) if orjson else None
+
+    def envelope(data):
+        return {"status": "success", "message": "ok", "data": {"data": data, "pagination": {}}}
+
+    cases = [
+        ("stdlib + column walk", stdlib, lambda: [column_walk(t) for t in transactions]),
+        ("stdlib + to_dict", stdlib, lambda: [t.to_dict() for t in transactions]),
+    ]
+    if fast:
+        cases += [
+            ("orjson + to_dict", fast, lambda: [t.to_dict() for t in transactions]),
+            ("orjson + projection", fast, lambda: TRANSACTION_VIEW.dump_many(transactions)),
+        ]
+    else:
+        print("orjson is not installed, only the stdlib cases run")
+
+    print(f"{args.transactions} transactions x {args.items} items, median of {args.runs} runs")
+    with app.app_context():
+        for name, provider, dump in cases:
+            times = timeit.repeat(lambda: provider.response(envelope(dump())), number=1, repeat=args.runs)
+            print(f"{name:<22} {median(times) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
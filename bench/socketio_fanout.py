@@ -0,0 +1,131 @@
+"""Socket.IO fan-out load test.
+
+Connects thousands of admin clients spread over several running workers,
+places checkouts through the API and measures how long
+``new_product_transaction_created`` takes to reach every client.
+
+Start the workers first, all on one database and one message queue, e.g.::
+
+    export SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0
+    for port in 5001 5002 5003 5004; do
+        gunicorn -k geventwebsocket.gunicorn.workers.GeventWebSocketWorker \\
+            -w 1 -b 127.0.0.1:$port main:app &
+    done
+
+then, with an admin and a regular user account and a product in stock::
+
+    pip install "python-socketio[client]" requests
+    python bench/socketio_fanout.py \\
+        --worker http://127.0.0.1:5001 --worker http://127.0.0.1:5002 \\
+        --worker http://127.0.0.1:5003 --worker http://127.0.0.1:5004 \\
+        --clients 4000 --events 50 \\
+        --admin admin@example.com:secret --buyer user@example.com:secret \\
+        --product <product id> --permission-key $SECRET_API_KEY
+
+Latency is measured from just before the checkout request is sent until a
+client receives the event, so it includes the request itself.
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import statistics
+import time
+
+import gevent
+import requests
+import socketio
+
+EVENT = 'new_product_transaction_created'
+
+
+def login(worker, credentials, permission_key):
+    email, password = credentials.split(':', 1)
+    resp = requests.post(f"{worker}/api/user/login", json={'email': email, 'password': password},
+                         headers={'Permission-Key': permission_key})
+    resp.raise_for_status()
+    return resp.json()['data']['token']
+
+
+class Listener:
+    def __init__(self, worker, token, received):
+        self.client = socketio.Client(reconnection=False)
+        self.worker = worker
+        self.token = token
+        self.client.on(EVENT, lambda data: received.setdefault(data['id'], []).append(time.perf_counter()))
+
+    def connect(self):
+        self.client.connect(self.worker, auth={'token': self.token}, transports=['websocket'])
+        self.client.emit('join_admin_room')
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--worker', action='append', required=True, help="Worker base URL, repeat per worker")
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.2, help="Seconds between checkouts")
+    parser.add_argument('--admin', required=True, help="email:password of an admin")
+    parser.add_argument('--buyer', required=True, help="email:password of the account that checks out")
+    parser.add_argument('--product', required=True, help="Product id bought once per event")
+    parser.add_argument('--permission-key', required=True)
+    parser.add_argument('--settle', type=float, default=5.0, help="Seconds to wait for late events")
+    args = parser.parse_args()
+
+    admin_token = login(args.worker[0], args.admin, args.permission_key)
+    buyer_token = login(args.worker[0], args.buyer, args.permission_key)
+
+    received = {}
+    listeners = [Listener(args.worker[i % len(args.worker)], admin_token, received) for i in range(args.clients)]
+
+    started = time.perf_counter()
+    jobs = [gevent.spawn(listener.connect) for listener in listeners]
+    gevent.joinall(jobs)
+    failed = sum(1 for job in jobs if job.exception is not None)
+    print(f"{args.clients - failed}/{args.clients} clients connected over {len(args.worker)} workers "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    sent = {}
+    headers = {'Permission-Key': args.permission_key, 'Authorization': f"Bearer {buyer_token}"}
+    body = {'product_id': args.product, 'quantity': 1, 'shipping_address': 'Load test', 'expedition_service': 'JNE'}
+    for i in range(args.events):
+        worker = args.worker[i % len(args.worker)]
+        start = time.perf_counter()
+        resp = requests.post(f"{worker}/api/product-transactions/checkout", json=body, headers=headers)
+        if resp.status_code != 201:
+            print(f"checkout failed: {resp.status_code} {resp.text}")
+            continue
+        sent[resp.json()['data']['id']] = start
+        gevent.sleep(args.interval)
+
+    gevent.sleep(args.settle)
+
+    latencies = []
+    per_event = []
+    for transaction_id, start in sent.items():
+        arrivals = received.get(transaction_id, [])
+        latencies.extend(arrival - start for arrival in arrivals)
+        per_event.append(len(arrivals))
+
+    expected = len(sent) * (args.clients - failed)
+    print(f"events: {len(sent)}, deliveries: {len(latencies)}/{expected}")
+    if latencies:
+        print("latency ms: p50 {:.1f}  p95 {:.1f}  p99 {:.1f}  max {:.1f}  mean {:.1f}".format(
+            percentile(latencies, 0.50) * 1000, percentile(latencies, 0.95) * 1000,
+            percentile(latencies, 0.99) * 1000, max(latencies) * 1000, statistics.mean(latencies) * 1000))
+        print(f"clients reached per event: min {min(per_event)}  max {max(per_event)}")
+
+    for listener in listeners:
+        try:
+            listener.client.disconnect()
+        except Exception:
+            pass
+
+
+if __name__ == '__main__':
+    main()
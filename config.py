@@ -20,4 +20,44 @@ class Config(object):
     SECRET_KEY = os.environ.get('SECRET_KEY')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     JWT_ACCESS_TOKEN_EXPIRES = 3600
-    DOCS_PASSWORD = os.environ.get('DOCS_PASSWORD')
\ No newline at end of file
+    DOCS_PASSWORD = os.environ.get('DOCS_PASSWORD')
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', 60))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    BACKGROUND_TASKS = os.getenv('BACKGROUND_TASKS', 'true').lower() == 'true'
+    BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 4))
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'flask-socketio')
+    SOCKETIO_BUFFERED_EMITS = os.getenv('SOCKETIO_BUFFERED_EMITS', 'true').lower() == 'true'
+    SOCKETIO_EMIT_BATCH = int(os.getenv('SOCKETIO_EMIT_BATCH', 100))
+    SOCKETIO_EMIT_QUEUE_SIZE = int(os.getenv('SOCKETIO_EMIT_QUEUE_SIZE', 10000))
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    SOCKETIO_LOG_SAMPLE_RATE = float(os.getenv('SOCKETIO_LOG_SAMPLE_RATE', 0.01))
+    JSON_DATETIME_FORMAT = os.getenv('JSON_DATETIME_FORMAT', 'http')
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    # /metrics answers 403 until this is set; scrapers send Authorization: Bearer <token>.
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.5))
+    CHOOSEN_COUNT_BUFFERED = os.getenv('CHOOSEN_COUNT_BUFFERED', 'true').lower() == 'true'
+    CHOOSEN_COUNT_FLUSH_INTERVAL = float(os.getenv('CHOOSEN_COUNT_FLUSH_INTERVAL', 2))
+    SHOP_OPEN_TIME = os.getenv('SHOP_OPEN_TIME', '09:00')
+    SHOP_CLOSE_TIME = os.getenv('SHOP_CLOSE_TIME', '21:00')
+    SHOP_SLOT_MINUTES = int(os.getenv('SHOP_SLOT_MINUTES', 60))
+    SHOP_CHAIRS = int(os.getenv('SHOP_CHAIRS', 2))
+    SHOP_CLOSED_WEEKDAYS = os.getenv('SHOP_CLOSED_WEEKDAYS', '')
+    HAIRWASH_PRICE = float(os.getenv('HAIRWASH_PRICE', 0))
+    PRICE_TABLE_TTL = int(os.getenv('PRICE_TABLE_TTL', os.getenv('CACHE_DEFAULT_TTL', 60)))
+    SEARCH_INDEX_MAX_DOCS = int(os.getenv('SEARCH_INDEX_MAX_DOCS', 20000))
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 500))
+    SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', os.getenv('CACHE_DEFAULT_TTL', 60)))
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+    IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', 10))
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 1024))
+    IDEMPOTENCY_PURGE_INTERVAL = int(os.getenv('IDEMPOTENCY_PURGE_INTERVAL', 300))
+    PROXY_FIX_HOPS = int(os.getenv('PROXY_FIX_HOPS', 0))
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000))
\ No newline at end of file
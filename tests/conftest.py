@@ -0,0 +1,94 @@
+import os
+
+os.environ.setdefault('SECRET_API_KEY', 'test-permission-key')
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt-secret-key-long-enough-for-hs256')
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+os.environ.setdefault('BACKGROUND_TASKS', 'false')
+os.environ.setdefault('CHOOSEN_COUNT_BUFFERED', 'false')
+os.environ.setdefault('SOCKETIO_BUFFERED_EMITS', 'false')
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from config import Config
+
+PERMISSION = {'Permission-Key': os.environ['SECRET_API_KEY']}
+PASSWORD = 'secret123'
+
+
+def _serialize_sqlite_writers(engine):
+    """pysqlite starts transactions lazily, so two requests that both read
+    before writing fail with "database is locked" instead of waiting. Start
+    every transaction with BEGIN IMMEDIATE so they queue up instead."""
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def begin(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The app on ``TEST_DATABASE_URL`` (a throwaway MySQL schema gives the
+    concurrency tests real row locks) or on a SQLite file."""
+    url = os.getenv('TEST_DATABASE_URL')
+    Config.SQLALCHEMY_DATABASE_URI = url or f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    if not url:
+        Config.SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30, 'check_same_thread': False}}
+
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            _serialize_sqlite_writers(db.engine)
+        db.create_all()
+
+    yield app
+
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    """Empties every table after the test. No app context stays pushed, so
+    requests made by the test get their own session like in production."""
+    from app.extensions import db
+
+    yield db
+
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+
+@pytest.fixture
+def make_user(app, db):
+    from app.models.user import User
+
+    def make_user(email, role='user'):
+        with app.app_context():
+            user = User(name=email.split('@')[0], email=email, password=generate_password_hash(PASSWORD), role=role)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    return make_user
+
+
+@pytest.fixture
+def login(app):
+    def login(email):
+        resp = app.test_client().post('/api/user/login', json={'email': email, 'password': PASSWORD}, headers=PERMISSION)
+        assert resp.status_code == 200, resp.get_json()
+        return {**PERMISSION, 'Authorization': f"Bearer {resp.get_json()['data']['token']}"}
+
+    return login
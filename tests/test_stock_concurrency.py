@@ -0,0 +1,128 @@
+"""Concurrent checkouts against scarce stock.
+
+Run against MySQL (``TEST_DATABASE_URL=mysql+pymysql://...``) to exercise
+real row locks; on the default SQLite file the writers are serialised by the
+database, which still checks that failed reservations leave nothing behind.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+CHECKOUTS = 40
+STOCK = 7
+
+
+@pytest.fixture
+def product(app, db):
+    from app.models.product import Product
+
+    def product(name, stock):
+        with app.app_context():
+            row = Product(name=name, description=name, price=10000, stock=stock, image_url='x', image_key='k')
+            db.session.add(row)
+            db.session.commit()
+            return row.id
+
+    return product
+
+
+def _stock(app, product_id):
+    from app.extensions import db
+    from app.models.product import Product
+
+    with app.app_context():
+        return db.session.query(Product.stock).filter(Product.id == product_id).scalar()
+
+
+class StockWatcher(threading.Thread):
+    """Samples stock while the checkouts run and keeps the lowest value."""
+
+    def __init__(self, app, product_ids):
+        super().__init__(daemon=True)
+        self.app = app
+        self.product_ids = product_ids
+        self.lowest = {product_id: _stock(app, product_id) for product_id in product_ids}
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.is_set():
+            for product_id in self.product_ids:
+                self.lowest[product_id] = min(self.lowest[product_id], _stock(self.app, product_id))
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+
+def _hammer(app, requests):
+    """POST every ``(headers, body)`` to checkout at once; returns the
+    status codes."""
+    start = threading.Barrier(len(requests))
+
+    def checkout(headers, body):
+        client = app.test_client()
+        start.wait()
+        return client.post('/api/product-transactions/checkout', json=body, headers=headers).status_code
+
+    with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+        return list(pool.map(lambda args: checkout(*args), requests))
+
+
+def _checkout_body(**extra):
+    return {'shipping_address': 'Jl. Sudirman 1', 'expedition_service': 'JNE', **extra}
+
+
+def test_direct_checkouts_never_oversell(app, db, make_user, login, product):
+    from app.models.product_transactions import ProductTransaction, TransactionItem
+
+    product_id = product('Pomade', STOCK)
+    users = [login(f"buyer{i}@example.com") for i in range(4) if make_user(f"buyer{i}@example.com")]
+    requests = [(users[i % len(users)], _checkout_body(product_id=product_id, quantity=1)) for i in range(CHECKOUTS)]
+
+    watcher = StockWatcher(app, [product_id])
+    watcher.start()
+    statuses = _hammer(app, requests)
+    watcher.stop()
+
+    assert set(statuses) <= {201, 400}
+    assert statuses.count(201) == STOCK
+    assert watcher.lowest[product_id] >= 0
+    assert _stock(app, product_id) == 0
+
+    with app.app_context():
+        assert ProductTransaction.query.count() == STOCK
+        assert sum(item.quantity for item in TransactionItem.query) == STOCK
+
+
+def test_cart_checkouts_reserve_all_or_nothing(app, db, make_user, login, product):
+    """Every cart holds one scarce and one plentiful product, added in
+    alternating order; a cart that misses the scarce one takes neither."""
+    from app.models.product_transactions import CartItem
+
+    scarce = product('Pomade', STOCK)
+    plenty = product('Comb', CHECKOUTS)
+
+    requests = []
+    for i in range(CHECKOUTS):
+        email = f"cart{i}@example.com"
+        make_user(email)
+        headers = login(email)
+        for product_id in ((scarce, plenty) if i % 2 else (plenty, scarce)):
+            resp = app.test_client().post('/api/carts', json={'product_id': product_id, 'quantity': 1}, headers=headers)
+            assert resp.status_code in (200, 201), resp.get_json()
+        requests.append((headers, _checkout_body()))
+
+    watcher = StockWatcher(app, [scarce, plenty])
+    watcher.start()
+    statuses = _hammer(app, requests)
+    watcher.stop()
+
+    assert set(statuses) <= {201, 400}
+    assert statuses.count(201) == STOCK
+    assert watcher.lowest[scarce] >= 0
+    assert _stock(app, scarce) == 0
+    assert _stock(app, plenty) == CHECKOUTS - STOCK
+
+    with app.app_context():
+        assert CartItem.query.count() == 2 * (CHECKOUTS - STOCK)